@@ -1,8 +1,10 @@
 # Copyright 2019 (C) Lukas Berger [lukas.berger@uranus.uni-freiburg.de]
 
 import dijkstra as dijk
-from math import inf as infinity
+from shortest_path import nearest_vertex
 from GraphGenerator import delete_vertex
+from occupancy import AlreadyTakenError
+from path_index import path_bits
 
 
 class Agent:
@@ -10,12 +12,27 @@ class Agent:
     Realization of the agent
     """
 
-    def __init__(self, graph, id, pos, real_goal, goals):
+    def __init__(self, graph, id, pos, real_goal, goals, path_finder=dijk.dijkstra, fields=None, world=None,
+                 occupancy=None, memo=None, path_cache=None):
         self.graph = graph
         self.id = id
         self.pos = pos
         self.real_goal = real_goal
-        self.goal_path = dijk.dijkstra(self.graph, self.pos, self.real_goal)
+        # path_finder(graph, start, goal) is used for every path query, e.g. astar.grid_planner(m)
+        self.find_path = path_finder
+        # a DistanceFieldCache shared by all agents on the graph, used for paths to goals
+        self.fields = fields
+        # a WorldModel shared by all agents, which holds the paths of every agent to its goals
+        self.world = world
+        # an OccupancyIndex shared by all agents, which knows the agent on every vertex
+        self.occupancy = occupancy
+        # a RoundMemo shared by all agents, which memoizes the goal path bitsets of the collision checks of a round
+        self.memo = memo
+        # a PathCache shared by all agents in front of path_finder and the distance fields, its paths are tuples
+        self.path_cache = path_cache
+        # a SolveStats, while Solver.solve measures the agent
+        self.stats = None
+        self.goal_path = self.path_to_goal(self.pos, self.real_goal)
         self.goals = goals
         self.agents = {}
         self.escape = None
@@ -23,6 +40,8 @@ class Agent:
         self.escape_path = []
         self.all_paths = []
         self.finished = False
+        # the step of the world model, at which the agent looked at the other agents the last time
+        self.observed_at = None
 
     def __str__(self):
         output = f"ID:{self.id}\n"
@@ -68,8 +87,9 @@ class Agent:
         """
         for a in agents:
             if a.get_id() != self.get_id():
-                agent = self.ReducedAgent(a)
+                agent = self.ReducedAgent(a, self.world)
                 self.agents[a.get_id()] = agent
+        self.observe()
 
     def update_agents(self, agents):
         """
@@ -87,9 +107,12 @@ class Agent:
                         for goal in self.agents[a.get_id()].get_goals():
                             self.agents[a.get_id()].goals[goal] = True
                         if a.get_pos() in self.graph.keys():
-                            delete_vertex(self.graph, a.get_pos())
+                            self.remove_vertex(a.get_pos())
+                    elif self.unchanged(a):
+                        # the agent did not move and its paths are the same, so only the waiting counts
+                        self.agents[a.get_id()].wait()
                     else:
-                        agent = self.ReducedAgent(a)
+                        agent = self.ReducedAgent(a, self.world)
                         agent.waited_since = self.agents[a.get_id()].waited_since
                         # check for position change
                         if self.agents[a.get_id()].get_pos() == agent.get_pos():
@@ -111,6 +134,24 @@ class Agent:
                             for goal in agent.get_goals():
                                 agent.goals[goal] = True
                         self.agents[a.get_id()] = agent
+        self.observe()
+
+    def observe(self):
+        """ Remembers the step of the world model, up to which the agent knows the other agents """
+        if self.world is not None:
+            self.observed_at = self.world.step
+
+    def unchanged(self, agent):
+        """
+        Tests with the changes published in the world model, if an agent did not move and no vertex
+        on its paths got deleted since the last update, so its ReducedAgent does not have to be rebuilt
+        """
+        if self.world is None:
+            return False
+        belief = self.agents[agent.get_id()]
+        if belief.get_pos() != agent.get_pos():
+            return False
+        return self.world.unchanged(agent.get_id(), self.observed_at, belief.paths)
 
     def move_on_goal_path(self):
         """
@@ -119,18 +160,13 @@ class Agent:
         """
         moved = False
         if not self.on_goal():
-            already_taken = False
             if len(self.goal_path) <= 1:
                 self.update_goal_path()
             if self.goal_path[1] in self.graph[self.pos]:
-                for agent in self.agents.keys():
-                    if self.agents[agent].get_pos() == self.goal_path[1]:
-                        already_taken = True
-                        # print(f"ALREADY TAKEN by {agent}")
-                if not already_taken:
+                if self.agent_at(self.goal_path[1]) is None:
                     # print(f"agent: {self.get_id()} moved from {self.get_pos()} to {self.goal_path[1]}")
                     moved = self.move_to(self.goal_path[1])
-                    self.update_goal_path()
+                    self.advance_goal_path()
             else:
                 self.update_goal_path()
                 self.move_on_goal_path()
@@ -138,18 +174,52 @@ class Agent:
 
     def update_goal_path(self):
         """ calculates new goal path from current position"""
-        self.goal_path = dijk.dijkstra(self.graph, self.pos, self.real_goal)
+        self.goal_path = self.path_to_goal(self.pos, self.real_goal)
+
+    def advance_goal_path(self):
+        """
+        Drops the vertex the agent just left from its goal path. The rest stays a shortest path,
+        as long as none of its vertices got deleted, because deleting vertices never shortens a path
+        """
+        rest = self.goal_path[1:]
+        if all(vertex in self.graph for vertex in rest):
+            self.goal_path = rest
+        else:
+            self.update_goal_path()
+
+    def path_to_goal(self, start, goal):
+        """ Returns the path from start to a goal, using the distance fields if there are any """
+        if self.stats is not None:
+            self.stats.path_queries += 1
+        if self.fields is not None:
+            return self.shortest_path(self.fields.find_path, start, goal)
+        return self.shortest_path(self.find_path, start, goal)
+
+    def shortest_path(self, finder, start, goal):
+        """ Returns finder(graph, start, goal), from the path cache if there is one """
+        if self.path_cache is not None:
+            return self.path_cache.path(finder, start, goal)
+        return finder(self.graph, start, goal)
+
+    def remove_vertex(self, vertex):
+        """ Deletes a vertex from the graph and keeps the distance fields up to date """
+        neighbors = self.graph[vertex]
+        delete_vertex(self.graph, vertex)
+        if self.stats is not None:
+            self.stats.deleted_vertices += 1
+        if self.fields is not None:
+            self.fields.vertex_deleted(vertex, neighbors)
+        if self.world is not None:
+            self.world.vertex_deleted(vertex)
+        if self.path_cache is not None:
+            self.path_cache.vertex_deleted()
 
     def move_on_escape_path(self):
         """ lets the agent move on its escape path """
         moved = False
         if not self.on_escape():
-            already_taken = False
             if self.escape_path[1] in self.graph[self.pos]:
-                for agent in self.agents.keys():
-                    if self.agents[agent].get_pos() == self.escape_path[1]:
-                        already_taken = True
-                if not already_taken:
+                if self.agent_at(self.escape_path[1]) is None:
                     # print(f"agent: {self.get_id()} moved from {self.get_pos()} to {self.escape_path[1]}"
                     moved = self.move_to(self.escape_path[1])
                     self.update_escape_path()
@@ -160,7 +230,9 @@ class Agent:
 
     def update_escape_path(self):
         """ calculates new path to the current escape """
-        self.escape_path = dijk.dijkstra(self.graph, self.pos, self.escape)
+        if self.stats is not None:
+            self.stats.searches += 1
+        self.escape_path = self.shortest_path(self.find_path, self.pos, self.escape)
 
     def on_goal(self):
         """
@@ -183,43 +255,45 @@ class Agent:
     def has_collision(self, agent_id):
         """
         Agent checks if its own goal path is in collision to all the
-        goal paths of the other agent
+        goal paths of the other agent. With a world model this is a bitwise and
+        with the paths in its path index
         """
-        paths = self.calculate_goal_paths(agent_id)
-        for vertex in self.goal_path:
-            for path in paths:
-                if vertex in path:
+        if self.world is not None and self.world.path_index is not None and self.world.has_current_view(agent_id):
+            agent = self.agents[agent_id]
+            keys = [(agent_id, goal) for goal in agent.get_goals() if not agent.goals[goal]]
+            return self.world.path_index.collides(self.goal_path_bits(), keys)
+        on_goal_path = set(self.goal_path)
+        for path in self.calculate_goal_paths(agent_id):
+            for vertex in path:
+                if vertex in on_goal_path:
                     return True
         return False
 
+    def goal_path_bits(self):
+        """ Returns the goal path as bitset, every agent asks for it once per other agent in a round """
+        if self.memo is None:
+            return path_bits(self.goal_path)
+        path = tuple(self.goal_path)
+        return self.memo.get(("goal_path_bits", path), path_bits, path)
+
     def calculate_goal_paths(self, agent_id):
         """ Calculates paths to all goals of agent"""
         paths = []
         for goal in self.agents[agent_id].get_goals():
             if not self.agents[agent_id].goals[goal]:
-                path = dijk.dijkstra(self.graph, self.agents[agent_id].get_pos(), goal)
+                path = self.path_to_goal(self.agents[agent_id].get_pos(), goal)
                 paths.append(path)
         return paths
 
     def find_nearest_escape(self, pos):
         """ searches for an escape which is a vertex which is on no path of all
-        goal paths of all agents"""
+        goal paths of all agents. Returns a tuple (escape, distance) """
+        if self.stats is not None:
+            self.stats.escape_searches += 1
         on_path = set()
-        escapes = set()
         for path in self.all_paths:
-            for vertex in path:
-                on_path.add(vertex)
-        for vertex in self.graph.keys():
-            if vertex not in on_path:
-                escapes.add(vertex)
-        min_dist = infinity
-        min_escape = None
-        for escape in escapes:
-            distance = len(dijk.dijkstra(self.graph, pos, escape))
-            if distance < min_dist:
-                min_dist = distance
-                min_escape = escape
-        return min_escape
+            on_path.update(path)
+        return nearest_vertex(self.graph, pos, lambda vertex: vertex not in on_path)
 
     def must_escape(self, agent_id):
         """
@@ -227,12 +301,9 @@ class Agent:
         to the next escape
         """
         if self.has_collision(agent_id):
-            escape = self.find_nearest_escape(self.pos)
-            a_escape = self.find_nearest_escape(self.agents[agent_id].get_pos())
+            escape, own_distance = self.find_nearest_escape(self.pos)
+            _, other_distance = self.find_nearest_escape(self.agents[agent_id].get_pos())
             if escape is not None:
-                escape_path = dijk.dijkstra(self.graph, self.pos, escape)
-                own_distance = len(escape_path)
-                other_distance = len(dijk.dijkstra(self.graph, self.agents[agent_id].get_pos(), a_escape))
                 if own_distance < other_distance:
                     return True, escape
                 if own_distance > other_distance:
@@ -266,10 +337,10 @@ class Agent:
     def move(self):
         """ lets the agent move according to its current state (escaping or running to the goal) """
         moved = False
-        for agent_id in self.agents.keys():
-            if self.get_pos() == self.agents[agent_id].get_pos():
-                raise self.AlreadyTakenError(f"Agent {self.get_id()} and \
-                Agent {agent_id} are on the same position ")
+        agent_id = self.agent_at(self.get_pos())
+        if agent_id is not None:
+            raise self.AlreadyTakenError(f"Agent {self.get_id()} and \
+            Agent {agent_id} are on the same position ")
         if not self.escaping:
             moved = self.move_on_goal_path() or moved
         elif not self.on_goal():
@@ -279,18 +350,37 @@ class Agent:
 
     def move_to(self, vertex):
         """ Changes the agents position after checking if it is blocked by another agent """
-        for agent in self.agents.keys():
-            if self.agents[agent].get_pos() == vertex:
+        if self.occupancy is None:
+            agent = self.agent_at(vertex)
+            if agent is not None:
                 raise self.AlreadyTakenError(f"Invalid move from agent {self.get_id()} \
                 , {vertex} is already taken by {agent}")
         if vertex not in self.graph[self.get_pos()]:
             raise ValueError(f"{vertex} is no neighbor of {self.get_pos()}")
+        if self.occupancy is not None:
+            # raises the AlreadyTakenError, if vertex is taken
+            self.occupancy.move(self.get_id(), vertex)
         # print(f"agent: {self.get_id()} moved from {self.get_pos()} to {vertex}")
         self.pos = vertex
         return True
 
+    def agent_at(self, vertex):
+        """ Returns the id of the other agent on vertex or None, in O(1) with the occupancy index """
+        if self.occupancy is not None:
+            agent_id = self.occupancy.agent_at(vertex)
+            return agent_id if agent_id != self.get_id() else None
+        for agent_id in self.agents.keys():
+            if self.agents[agent_id].get_pos() == vertex:
+                return agent_id
+        return None
+
     def get_all_agent_pos(self):
         """ Returns a Generator for agent position generator """
+        if self.occupancy is not None:
+            for agent_id, vertex in self.occupancy.positions.items():
+                if agent_id != self.get_id():
+                    yield vertex
+            return
         for agent in self.agents.keys():
             yield self.agents[agent].get_pos()
 
@@ -302,19 +392,20 @@ class Agent:
         """
         if not self.on_goal():
             blocked_vertex = []
-            for agent in self.agents.values():
-                for vertex in self.graph[self.get_pos()]:
-                    if not agent.on_goal:
-                        if agent.get_pos() == vertex:
-                            blocked_vertex.append(vertex)
+            for vertex in self.graph[self.get_pos()]:
+                agent_id = self.agent_at(vertex)
+                if agent_id is not None and not self.agents[agent_id].on_goal:
+                    blocked_vertex.append(vertex)
             if len(blocked_vertex) > 0:
-                all_vertices = self.get_all_vertices_on_paths()
+                if self.stats is not None:
+                    self.stats.immediate_escapes += 1
+                on_paths = self.on_paths_test()
                 best_escape = set()
                 ok_escape = set()
                 bad_escape = set()
                 for escape in self.graph[self.get_pos()]:
                     if escape not in blocked_vertex:
-                        if escape not in all_vertices:
+                        if not on_paths(escape):
                             if escape in self.goal_path:
                                 best_escape.add(escape)
                             ok_escape.add(escape)
@@ -331,6 +422,17 @@ class Agent:
                     self.move_to(bad_escape.pop())
                     self.update_goal_path()
 
+    def on_paths_test(self):
+        """
+        Returns a function, which tests whether a vertex is in get_all_vertices_on_paths. With a world
+        model and an occupancy index it looks the vertex up in their indices instead of collecting all vertices
+        """
+        if self.world is not None and self.world.path_index is not None and self.occupancy is not None:
+            index = self.world.path_index
+            return lambda vertex: (self.agent_at(vertex) is not None
+                                   or index.is_covered_by_others(vertex, self.get_id()))
+        return self.get_all_vertices_on_paths().__contains__
+
     def get_all_vertices_on_paths(self):
         """ Returns all the vertices of the paths of the agents, despite it being waiting"""
         vertices_on_paths = set()
@@ -343,17 +445,28 @@ class Agent:
         return vertices_on_paths
 
     class ReducedAgent:
-        """ The representation of the other agents within the agent itself"""
-        def __init__(self, agent):
+        """ The representation of the other agents within the agent itself.
+        With a WorldModel the paths are the shared (read only) ones of the agent's view """
+        def __init__(self, agent, world=None):
             self.pos = agent.get_pos()
             self.goals = {}
             self.paths = {}
             self.waited_since = 0
             self.waiting = False
             self.on_goal = False
+            if world is not None:
+                self.paths = world.view(agent).paths
             for goal in agent.get_goals():
                 self.goals[goal] = False
-                self.paths[goal] = dijk.dijkstra(agent.graph, self.pos, goal)
+                if world is None:
+                    self.paths[goal] = agent.path_to_goal(self.pos, goal)
+
+        def wait(self):
+            """ Counts one more round without a move, the same as rebuilding the ReducedAgent at the same position """
+            self.waited_since += 1
+            self.waiting = self.waited_since > 1
+            for goal in self.goals:
+                self.goals[goal] = self.waiting
 
         def get_paths(self):
             return self.paths
@@ -364,5 +477,5 @@ class Agent:
         def get_pos(self):
             return self.pos
 
-    class AlreadyTakenError(Exception):
-        pass
+    # the error is raised by the occupancy index, it is kept here for the callers of Agent.AlreadyTakenError
+    AlreadyTakenError = AlreadyTakenError
@@ -1,7 +1,10 @@
 # Copyright 2019 (C) Lukas Berger [lukas.berger@uranus.uni-freiburg.de]
 
 import random
+from collections import Counter
+from time import perf_counter
 import dijkstra as dijk
+from compact_graph import CompactGraph, GridGraph
 
 
 def generate_grid(m, n):
@@ -30,19 +33,33 @@ def map_positions(x, y, m):
     return y * m + x
 
 
-def place_random_agents(graph, amount):
+def place_random_agents(graph, amount, rng=random):
     """
     Places an amount of agents randomly on the map.
+    rng can be a random.Random, by default the random module itself is used
     """
     if amount > len(graph.keys()) - 1:
         raise ValueError("You cannot place more agents on the graph, than vertecies itself")
-    agent_list = []
-    for i in range(0, amount):
-        agent_pos = random.sample(graph.keys(), 1)[0]
-        while agent_pos in agent_list:
-            agent_pos = random.sample(graph.keys(), 1)[0]
-        agent_list.append(agent_pos)
-    return tuple(agent_list)
+    return tuple(sample_vertices(graph, amount, rng))
+
+
+def sample_vertices(graph, amount, rng=random):
+    """
+    Returns a list of amount distinct random vertices of graph.
+    The cells of a GridGraph are drawn out of range(graph.capacity) without listing its vertices,
+    blocked cells among them are skipped
+    """
+    if not isinstance(graph, GridGraph):
+        return rng.sample(tuple(graph.keys()), amount)
+    if len(graph) == graph.capacity:
+        return rng.sample(range(graph.capacity), amount)
+    # a few more cells than the share of blocked cells needs, the free ones of them are still a uniform sample
+    cells = min(graph.capacity, amount * graph.capacity // max(len(graph), 1) + amount // 8 + 16)
+    vertices = [cell for cell in rng.sample(range(graph.capacity), cells) if not graph.is_blocked(cell)]
+    if len(vertices) < amount:
+        # too many blocked cells were drawn, or most cells are blocked
+        return rng.sample(tuple(graph.keys()), amount)
+    return vertices[0:amount]
 
 
 def place_random_goals_for_two(graph, goals1, goals2):
@@ -50,60 +67,72 @@ def place_random_goals_for_two(graph, goals1, goals2):
      Generates a tuple of sets, which corresponds to the goals of agent 1/2
     NOTE THAT I HAVE ALMOST NO RESTRICTION ON GENERATING THESE GOALS
     """
-    agent1_goals = set()
-    while len(agent1_goals) < goals1:
-        goal = random.sample(graph.keys(), 1)[0]
-        if goal not in agent1_goals:
-            agent1_goals.add(goal)
-    agent2_goals = set()
-    while len(agent2_goals) < goals2:
-        goal = random.sample(graph.keys(), 1)[0]
-        if goal not in agent2_goals:
-            agent2_goals.add(goal)
+    vertices = tuple(graph.keys())
+    agent1_goals = set(random.sample(vertices, goals1))
+    agent2_goals = set(random.sample(vertices, goals2))
     return agent1_goals, agent2_goals
 
 
-def place_real_goal(graph, agents):
+def place_real_goal(graph, agents, rng=random):
     """ Places the real goal randomly on the graph """
-    goals = []
-    for i in range(0, len(agents)):
-        pos = random.sample(graph.keys(), 1)[0]
-        while pos in goals:
-            pos = random.sample(graph.keys(), 1)[0]
-        goals.append(pos)
-    return tuple(goals)
+    return tuple(sample_vertices(graph, len(agents), rng))
 
 
-def place_random_goals(graph, agents, real_goals, lower_goal_limit, upper_goal_limit):
+def place_random_goals(graph, agents, real_goals, lower_goal_limit, upper_goal_limit, rng=random):
     """ Generates a tuple of sets, which corresponds to the goals of agent 1/2
     NOTE THAT THERE CAN BE ONLY ONE GOAL ON A VERTEX SIMULATANEOUSLY"""
     if len(graph.keys()) < upper_goal_limit * len(agents):
         raise ValueError("You cannot put more goals into the graph,than verticies itself")
+    amounts = [rng.randint(lower_goal_limit, upper_goal_limit) - 1 for agent in agents]
+    taken = set(real_goals)
+    decoys = rng.sample([vertex for vertex in graph.keys() if vertex not in taken], sum(amounts))
+    return split_goals(real_goals, decoys, amounts)
+
+
+def split_goals(real_goals, decoys, amounts):
+    """ Returns the goal sets of the agents: the real goal and the next amount decoys for every agent """
     all_goals = []
-    all_goals_of_all_agents = set()
-    for agent in agents:
-        goal_amount = random.randint(lower_goal_limit, upper_goal_limit)
-        goal_list = list()
-        goal_list.append(real_goals[agents.index(agent)])
-        all_goals_of_all_agents.add(real_goals[agents.index(agent)])
-        for i in range(1, goal_amount):
-            goal_pos = random.sample(graph.keys(), 1)[0]
-            while goal_pos in real_goals or goal_pos in goal_list or goal_pos in all_goals_of_all_agents:
-                goal_pos = random.sample(graph.keys(), 1)[0]
-            goal_list.append(goal_pos)
-            all_goals_of_all_agents.add(goal_pos)
-        all_goals.append(set(goal_list))
+    first = 0
+    for real_goal, amount in zip(real_goals, amounts):
+        all_goals.append({real_goal, *decoys[first:first + amount]})
+        first += amount
     return tuple(all_goals)
 
 
+def place_random_instance(graph, agent_amount, lower_goal_limit, upper_goal_limit, rng=random):
+    """
+    Places the agents, their real goals and their decoy goals without any rejection. The starts are one
+    sample of distinct vertices, all goals another one, so no two goals share a vertex,
+    but a goal can be the start of an agent. Returns (agents, real_goals, goals)
+    """
+    if agent_amount > len(graph) - 1:
+        raise ValueError("You cannot place more agents on the graph, than vertecies itself")
+    if len(graph) < upper_goal_limit * agent_amount:
+        raise ValueError("You cannot put more goals into the graph,than verticies itself")
+    agents = tuple(sample_vertices(graph, agent_amount, rng))
+    amounts = [rng.randint(lower_goal_limit, upper_goal_limit) - 1 for agent in agents]
+    goals = sample_vertices(graph, agent_amount + sum(amounts), rng)
+    real_goals = tuple(goals[0:agent_amount])
+    return agents, real_goals, split_goals(real_goals, goals[agent_amount:], amounts)
+
+
 def delete_vertex(graph, vertex):
-    """ Deletes a vertex out of a graph and all of its dependencies """
-    for v in graph:
-        if vertex in graph[v]:
-            graph[v].remove(vertex)
+    """ Deletes a vertex out of a graph and all of its dependencies.
+    The graph has to be undirected, so only the neighbors of vertex refer to it """
+    if isinstance(graph, (CompactGraph, GridGraph)):
+        graph.remove_vertex(vertex)
+        return
+    for neighbor in graph[vertex]:
+        graph[neighbor].discard(vertex)
     del graph[vertex]
 
 
+def delete_vertices(graph, vertices):
+    """ Deletes all vertices out of a graph, see delete_vertex """
+    for vertex in vertices:
+        delete_vertex(graph, vertex)
+
+
 def generate_paths_for_two(graph, agents, goals):
     """ Generates lists of paths from agents to the corresponding goals """
     paths1 = {}
@@ -120,39 +149,39 @@ def generate_paths_for_two(graph, agents, goals):
 
 
 def generate_paths(graph, agents, goals):
-    """Calculates all the paths of the agents """
+    """
+    Calculates all the paths of the agents with a bidirectional BFS.
+    Every agent has only a few goals here, so a distance field over the whole graph per goal costs more
+    than it saves, the DistanceFieldCache is left to the solver
+    """
     path_list = []
-    for goal_collection in goals:
+    for agent_pos, goal_collection in zip(agents, goals):
         paths = {}
         for goal in goal_collection:
-            agent_pos = agents[goals.index(goal_collection)]
             path = dijk.dijkstra(graph, agent_pos, goal)
             paths[goal] = path
         path_list.append(paths)
     return tuple(path_list)
 
 
-def get_collisions(graph, agents, goals):
+def get_collisions(graph, agents, goals, paths=None):
     """
-    Returns the number of collision of all all agents in the graph
+    Returns the number of collision of all all agents in the graph: every vertex of a path of an agent
+    counts once for every other agent, which has the vertex on one of its paths.
+    paths can be the result of generate_paths, so the paths are not searched again
     """
+    if paths is None:
+        paths = generate_paths(graph, agents, goals)
+    # the amount of agents, which have a vertex on one of their paths
+    covering = Counter()
+    for agent_paths in paths:
+        covering.update({vertex for path in agent_paths.values() for vertex in path})
     collisions = 0
-    path_collection = []
-    for goal_collection in goals:
-        paths = []
-        for goal in goal_collection:
-            path = dijk.dijkstra(graph, agents[goals.index(goal_collection)], goal)
-            paths.append(path)
-        path_collection.append(paths)
-    for agent_paths in path_collection:
-        for other_agent_paths in path_collection:
-            if agent_paths != other_agent_paths:
-                for agent_path in agent_paths:
-                    for vertex in agent_path:
-                        for other_agent_path in other_agent_paths:
-                            if vertex in other_agent_path:
-                                collisions += 1
-                                break
+    for agent_paths in paths:
+        for path in agent_paths.values():
+            for vertex in path:
+                # the agent itself covers the vertex as well
+                collisions += covering[vertex] - 1
     return collisions
 
 
@@ -178,68 +207,125 @@ def is_part_of_path(vertex, path):
     return False
 
 
-def reduce_not_used_vertices(graph, paths):
-    """ Reduces the given graph of all unused vertices
-        by checking if a vertex is part of a path, or neighbor of a part of path"""
-    copy = graph.copy()
-    all_paths = []
-    for path_collection in paths:
-        for path in path_collection.values():
-            all_paths += path
-    for vertex in copy.keys():
-        if vertex not in all_paths:
-            if not is_neighbor_of_path(graph, vertex, all_paths):
-                delete_vertex(graph, vertex)
+def vertices_on_paths(paths):
+    """ Returns the set of all vertices on the paths of generate_paths """
+    return {vertex for path_collection in paths for path in path_collection.values() for vertex in path}
 
 
-def reduce_not_used_escapes(graph, paths):
-    """ Reduces all unused escapes, which means vertices that are neighbors
-    of a path, but there is an escape earlier in that specific path """
-    all_paths = []
-    first_escapes = []
-    redundant_escapes = []
-    for path_collection in paths:
-        for path in path_collection.values():
-            all_paths += path
+def unused_vertices(graph, paths, on_path):
+    """ Returns all vertices, which are neither part of a path nor neighbor of a part of a path """
+    used = set(on_path)
+    for vertex in on_path:
+        used.update(graph[vertex])
+    return [vertex for vertex in graph.keys() if vertex not in used]
+
+
+def unused_escapes(graph, paths, on_path):
+    """
+    Returns all unused escapes, which means vertices that are neighbors
+    of a path, but there is an escape earlier in that specific path
+    """
+    first_escapes = set()
+    escapes = set()
     for path_collection in paths:
         for path in path_collection.values():
             first_escape = None
             for vertex in path[::-1]:
                 for neighbor in graph[vertex]:
-                    if neighbor not in all_paths:
+                    if neighbor not in on_path:
+                        # the last one found belongs to the earliest vertex of the path with an escape
                         first_escape = neighbor
-                        if neighbor is not None:
-                            if neighbor not in redundant_escapes:
-                                redundant_escapes.append(neighbor)
-            first_escapes.append(first_escape)
-    for escape in redundant_escapes:
-        if escape not in first_escapes:
-            delete_vertex(graph, escape)
+                        escapes.add(neighbor)
+            if first_escape is not None:
+                first_escapes.add(first_escape)
+    return escapes - first_escapes
+
+
+# the passes of reduce_graph, every pass returns the vertices to delete and has to keep the vertices of the paths
+REDUCTION_PASSES = (unused_vertices, unused_escapes)
 
 
-def generate_problem_instance(n, m, agent_amount, lower_goal_amount, upper_goal_amount):
+def reduce_graph(graph, paths, passes=REDUCTION_PASSES):
+    """
+    Runs the reduction passes one after another on the graph. Every pass(graph, paths, on_path) gets the
+    set of vertices on the paths, which is only built once, and returns the vertices to delete.
+    Returns a list of (name of the pass, amount of deleted vertices)
+    """
+    on_path = vertices_on_paths(paths)
+    report = []
+    for reduction in passes:
+        vertices = reduction(graph, paths, on_path)
+        delete_vertices(graph, vertices)
+        report.append((reduction.__name__, len(vertices)))
+    return report
+
+
+def reduce_not_used_vertices(graph, paths):
+    """ Reduces the given graph of all unused vertices
+        by checking if a vertex is part of a path, or neighbor of a part of path"""
+    return reduce_graph(graph, paths, (unused_vertices,))[0][1]
+
+
+def reduce_not_used_escapes(graph, paths):
+    """ Reduces all unused escapes, which means vertices that are neighbors
+    of a path, but there is an escape earlier in that specific path """
+    return reduce_graph(graph, paths, (unused_escapes,))[0][1]
+
+
+def generate_problem_instance(n, m, agent_amount, lower_goal_amount, upper_goal_amount, implicit=False,
+                              seed=None, timings=None):
     """
     Generates a dict of all the required information to create a problem instance
+    With implicit=True the grid is a GridGraph, which does not store any adjacency
+    With a seed, the instance is drawn from its own random.Random(seed) and always the same,
+    otherwise from the random module
+    timings can be a dict, to which the seconds of every step are added (generate_grid, placement,
+    generate_paths, reductions and get_collisions)
     """
     data = {}
-    graph = generate_grid(n, m)
-    agents = place_random_agents(graph, agent_amount)
-    real_goals = place_real_goal(graph, agents)
-    goals = place_random_goals(graph, agents, real_goals, lower_goal_amount, upper_goal_amount)
+    start = perf_counter()
+    if implicit:
+        graph = GridGraph(n, m)
+    else:
+        graph = generate_grid(n, m)
+    start = lap(timings, "generate_grid", start)
+    rng = random.Random(seed) if seed is not None else random
+    agents, real_goals, goals = place_random_instance(graph, agent_amount, lower_goal_amount,
+                                                      upper_goal_amount, rng)
+    start = lap(timings, "placement", start)
     paths = generate_paths(graph, agents, goals)
-    reduce_not_used_vertices(graph, paths)
-    reduce_not_used_escapes(graph, paths)
-    data["collisions"] = get_collisions(graph, agents, goals)
+    start = lap(timings, "generate_paths", start)
+    reduce_graph(graph, paths)
+    start = lap(timings, "reductions", start)
+    # the reductions keep every vertex of the paths, so the paths are still shortest paths
+    data["collisions"] = get_collisions(graph, agents, goals, paths)
+    lap(timings, "get_collisions", start)
     data["goals"] = goals
     data["Paths"] = paths
     data["real_goals"] = real_goals
     data["agents"] = agents
     data["graph"] = graph
+    data["width"] = n
     ("Graph:\n", graph_print(graph), "\nagents:\t", agents,
      "\nreal_goals:\t", real_goals, "\nreal_gaols\t", goals)
     return data
 
 
+def lap(timings, name, start):
+    """ Adds the seconds since start to timings[name], if there are timings, and returns the current time """
+    now = perf_counter()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + now - start
+    return now
+
+
+def generate_problem_instances(amount, n, m, agent_amount, lower_goal_amount, upper_goal_amount,
+                               implicit=False, seed=0):
+    """ Generates a list of amount problem instances, instance i is generated with the seed seed + i """
+    return [generate_problem_instance(n, m, agent_amount, lower_goal_amount, upper_goal_amount, implicit, seed + i)
+            for i in range(0, amount)]
+
+
 def graph_print(graph):
     """ s the graph in a reasonable manner so i can keep some sanity debugging this mess"""
     output = "graph = {"
@@ -1,10 +1,26 @@
 # Copyright 2019 (C) Lukas Berger [berger.lukas01@gmail.com]
 
+from array import array
+from collections import namedtuple
+from hashlib import blake2b
 import Agent
-from mapfdu import mapfdu
+from dijkstra import dijkstra
+from distance_field import DistanceFieldCache
+from world_model import WorldModel
+from occupancy import OccupancyIndex
+from round_memo import RoundMemo
+from path_cache import PathCache
 
+# solve returns (False, Livelock(round, period)), if the agents reached a state again
+Livelock = namedtuple("Livelock", ["round", "period"])
+# solve_rounds yields a RoundTrace of the changes of the agents after every round
+RoundTrace = namedtuple("RoundTrace", ["round", "changes"])
+Change = namedtuple("Change", ["agent", "source", "target", "escaping", "escape"])
+# the escape None in a fingerprint
+NO_ESCAPE = -1
 
-def initialize(data):
+
+def initialize(data, path_finder=None, distance_fields=None):
     """This initializes the Problem instance.
     Data should contain:
     graph: A dictionary of vertices with vertex sets as Neighborhood definition
@@ -12,56 +28,129 @@ def initialize(data):
     real_goals: A tuple of vertices, where the real goals are located on
     goals: All the possible goals as a tuple of sets. Including the real goals
     collisions (optional): the initial amount of collisions. Can be None if necessary
+    width (optional): the width of the grid, e.g. for path_finder=astar.grid_planner(data["width"])
+    path_finder can be given to use an other path finder than dijkstra for all path queries of the agents
+    distance_fields: the agents share one distance field per goal for all paths to goals instead of path_finder.
+    By default they are only used without a path_finder, a given path_finder is used for the goal paths as well
     See the commented example below, to understand how it works."""
     graph = data["graph"]
     agents_positions = data["agents"]
     real_goal = data["real_goals"]
     goals = data["goals"]
     collisions = data["collisions"]
+    if distance_fields is None:
+        distance_fields = path_finder is None
+    if path_finder is None:
+        path_finder = dijkstra
+    fields = DistanceFieldCache(graph) if distance_fields else None
+    world = WorldModel()
+    occupancy = OccupancyIndex(graph)
+    memo = RoundMemo()
+    path_cache = PathCache(graph)
     agents = []
     for agent_pos in agents_positions:
         agent = Agent.Agent(graph, agents_positions.index(agent_pos),
                             agent_pos, real_goal[agents_positions.index(agent_pos)],
-                            goals[agents_positions.index(agent_pos)])
+                            goals[agents_positions.index(agent_pos)], path_finder, fields, world, occupancy,
+                            memo, path_cache)
+        occupancy.place(agent.get_id(), agent_pos)
         agents.append(agent)
     for a in agents:
         a.init_agents(agents)
     return agents, collisions
 
 
-def solve(agents, max_rounds, verbosity):
+def solve(agents, max_rounds, verbosity, detect_livelock=True, stats=None):
     """
     This implements the round based execution of the agents
 
     :param agents: The initialized Agent instance.
     :param max_rounds: The maximum of rounds it should take, before aborting the solving process.
     :param verbosity: Console output for better understanding, what is happening.
-    :return: Tuple (True, rounds) if it solved the instance. (False, None) Else.
+    :param detect_livelock: Stops as soon as the agents are in the same state as in an earlier round,
+    because they would repeat the rounds in between forever.
+    :param stats: A SolveStats, which is filled with the counters and phase times of the run.
+    :return: Tuple (True, rounds) if it solved the instance. (False, Livelock(round, period)) if a livelock
+    was detected. (False, None) Else.
+    """
+    rounds = solve_rounds(agents, max_rounds, verbosity, detect_livelock, stats)
+    while True:
+        try:
+            next(rounds)
+        except StopIteration as stop:
+            return stop.value
+
+
+def solve_rounds(agents, max_rounds, verbosity=False, detect_livelock=True, stats=None):
     """
+    Runs solve round by round. Yields a RoundTrace after every round, with a Change for every agent
+    whose position, escaping flag or escape changed in it. The first RoundTrace is round 0 with the
+    initial state of all agents. The generator returns the result of solve
+    """
+    if stats is None:
+        return (yield from run_rounds(agents, max_rounds, verbosity, detect_livelock, None))
+    stats.start(agents)
+    try:
+        return (yield from run_rounds(agents, max_rounds, verbosity, detect_livelock, stats))
+    finally:
+        stats.finish(agents)
+
+
+def run_rounds(agents, max_rounds, verbosity, detect_livelock, stats):
+    """ The rounds of solve_rounds """
     finished_agents = 0
     rounds = 1
+    # fingerprint of the state at the beginning of a round and the round
+    seen = {}
+    # the agents of initialize share one world model, the moves are published to it,
+    # so the agents only update the other agents, which changed
+    world = agents[0].world if len(agents) > 0 else None
+    memo = agents[0].memo if len(agents) > 0 else None
+    yield RoundTrace(0, [Change(agent.get_id(), agent.pos, agent.pos, agent.escaping, agent.escape)
+                         for agent in agents])
     while finished_agents < len(agents) and rounds < max_rounds:
         if verbosity:
             print(f"rounds: {rounds}\n======================================")
         finished_agents = 0
-        if rounds > 1:
-            for agent in agents:
-                if verbosity:
-                    print(agent)
-                agent.update_agents(agents)
-                agent.check_for_escaping()
-                agent.move()
-                if agent.on_goal():
-                    finished_agents += 1
-        else:
-            for agent in agents:
+        if detect_livelock:
+            state = fingerprint(agents)
+            if state in seen:
                 if verbosity:
-                    print(agent)
+                    print(f"livelock detected at round {rounds} (period {rounds - seen[state]})")
+                return False, Livelock(rounds, rounds - seen[state])
+            seen[state] = rounds
+        if memo is not None:
+            memo.new_round()
+        if world is not None:
+            world.update(agents)
+        if stats is not None:
+            stats.rounds += 1
+        changes = []
+        for agent in agents:
+            if verbosity:
+                print(agent)
+            if stats is None:
                 agent.update_agents(agents)
+            else:
+                stats.phase("update_agents", agent, agent.update_agents, agents)
+            pos = agent.pos
+            escaping = agent.escaping
+            escape = agent.escape
+            if stats is None:
                 agent.check_for_escaping()
                 agent.move()
-                if agent.on_goal():
-                    finished_agents += 1
+            else:
+                stats.phase("check_for_escaping", agent, agent.check_for_escaping)
+                stats.phase("move", agent, agent.move)
+            if agent.pos != pos:
+                if world is not None:
+                    world.agent_moved(agent)
+                changes.append(Change(agent.get_id(), pos, agent.pos, agent.escaping, agent.escape))
+            elif agent.escaping != escaping or agent.escape != escape:
+                changes.append(Change(agent.get_id(), pos, pos, agent.escaping, agent.escape))
+            if agent.on_goal():
+                finished_agents += 1
+        yield RoundTrace(rounds, changes)
         rounds += 1
     if finished_agents == len(agents):
         return True, rounds
@@ -70,6 +159,25 @@ def solve(agents, max_rounds, verbosity):
     # for agent in agents:
     #    print(agent)
 
+
+def fingerprint(agents):
+    """
+    Returns a digest of everything the next rounds depend on: the graph (which only loses vertices,
+    so its size is enough), the position and escape of every agent and what it believes about the others.
+    waited_since only matters up to 2, from there on an agent is waiting.
+    The state has N * N entries, so solve only keeps its 16 byte blake2b digest for every round,
+    two different states are practically never taken for a livelock
+    """
+    state = array("q", [len(agents[0].graph)] if len(agents) > 0 else [])
+    for agent in agents:
+        state.extend((agent.pos, agent.escaping, NO_ESCAPE if agent.escape is None else agent.escape))
+        for belief in agent.agents.values():
+            goals = belief.goals.values()
+            state.extend((belief.pos, belief.on_goal, min(belief.waited_since, 2), belief.waiting, len(goals)))
+            state.extend(goals)
+    return blake2b(state.tobytes(), digest_size=16).digest()
+
+
 """
 TEST SECTION
 
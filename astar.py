@@ -0,0 +1,104 @@
+# Copyright 2019 (C) Lukas Berger [lukas.berger@uranus.uni-freiburg.de]
+
+from heapq import heappush, heappop
+from math import sqrt
+from shortest_path import NoPathError, check_endpoints, build_path, bfs_distances
+
+
+def astar(graph, start, goal, heuristic):
+    """
+    Returns the shortest path from start to goal as a list, every edge has the weight 1.
+    heuristic(vertex, goal) must never overestimate the distance from vertex to goal.
+    """
+    check_endpoints(graph, start, goal)
+    distances = {start: 0}
+    predecessors = {start: None}
+    # ties are broken by the smaller heuristic, which prefers the deeper vertex
+    h = heuristic(start, goal)
+    heap = [(h, h, 0, start)]
+    while heap:
+        f, h, distance, u = heappop(heap)
+        if u == goal:
+            return build_path(goal, predecessors)
+        if distance > distances[u]:
+            # outdated heap entry
+            continue
+        alt = distance + 1
+        for neighbor in graph[u]:
+            if alt < distances.get(neighbor, alt + 1):
+                distances[neighbor] = alt
+                predecessors[neighbor] = u
+                h = heuristic(neighbor, goal)
+                heappush(heap, (alt + h, h, alt, neighbor))
+    raise NoPathError(f"goal {goal} is not reachable from {start}")
+
+
+def manhattan(m):
+    """ Returns the manhattan distance heuristic for a grid of width m """
+    def heuristic(vertex, goal):
+        return abs(vertex % m - goal % m) + abs(vertex // m - goal // m)
+    return heuristic
+
+
+def octile(m):
+    """ Returns the octile distance heuristic for a grid of width m, which allows diagonal moves """
+    diagonal = sqrt(2) - 2
+
+    def heuristic(vertex, goal):
+        dx = abs(vertex % m - goal % m)
+        dy = abs(vertex // m - goal // m)
+        return dx + dy + diagonal * min(dx, dy)
+    return heuristic
+
+
+def select_landmarks(graph, amount):
+    """
+    Selects landmarks that are far away from each other, by always taking the
+    vertex with the largest distance to all landmarks chosen so far
+    """
+    landmarks = []
+    closest = {}
+    candidate = next(iter(graph.keys()))
+    for i in range(0, amount):
+        distances = bfs_distances(graph, candidate)
+        if i == 0:
+            # the first vertex is arbitrary, start from the vertex furthest away from it
+            candidate = max(distances, key=distances.get)
+            distances = bfs_distances(graph, candidate)
+        landmarks.append(candidate)
+        for vertex, distance in distances.items():
+            if distance < closest.get(vertex, distance + 1):
+                closest[vertex] = distance
+        candidate = max(closest, key=closest.get)
+    return landmarks
+
+
+def landmark_heuristic(graph, landmarks):
+    """
+    Returns the ALT heuristic (A*, landmarks and triangle inequality) for the given landmarks.
+    It stays admissible when vertices get deleted afterwards, because distances only grow.
+    """
+    tables = [bfs_distances(graph, landmark) for landmark in landmarks]
+
+    def heuristic(vertex, goal):
+        best = 0
+        for table in tables:
+            if vertex in table and goal in table:
+                bound = abs(table[goal] - table[vertex])
+                if bound > best:
+                    best = bound
+        return best
+    return heuristic
+
+
+def grid_planner(m, heuristic=None):
+    """
+    Returns a path finder with the same signature as dijkstra(graph, start, goal),
+    which uses A* with the manhattan heuristic for a grid of width m by default
+    """
+    if heuristic is None:
+        heuristic = manhattan(m)
+
+    def find_path(graph, start, goal):
+        return astar(graph, start, goal, heuristic)
+    return find_path
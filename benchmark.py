@@ -0,0 +1,238 @@
+# Copyright 2019 (C) Lukas Berger [lukas.berger@uranus.uni-freiburg.de]
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+from statistics import median
+from GraphGenerator import generate_problem_instance
+from Solver import initialize, solve
+from instance_store import save_instances, load_instances
+from runner import parse_pair
+from solve_stats import SolveStats
+
+Case = namedtuple("Case", ["n", "m", "agent_amount", "lower_goal_amount", "upper_goal_amount"])
+GENERATION_STEPS = ("generate_grid", "placement", "generate_paths", "reductions", "get_collisions")
+COUNTERS = ("path_queries", "searches", "escape_searches", "immediate_escapes", "deleted_vertices",
+            "field_builds", "nodes_expanded", "nodes_repaired")
+# metrics where lower is better, the throughputs are better the higher they are
+TIMES = ("generate", "initialize", "solve") + GENERATION_STEPS
+THROUGHPUTS = ("instances_per_second", "rounds_per_second")
+# every case is timed that often, the fastest run counts
+REPEATS = 5
+BASELINE_VERSION = 2
+
+
+def scaling_cases(sizes, agent_amounts, goal_bounds):
+    """ Returns the cases of all sizes (n, m), agent amounts and goal bounds, which fit into their grid """
+    cases = []
+    for n, m in sizes:
+        for agent_amount in agent_amounts:
+            for lower, upper in goal_bounds:
+                if agent_amount < n * m and upper * agent_amount <= n * m:
+                    cases.append(Case(n, m, agent_amount, lower, upper))
+    return cases
+
+
+def case_name(case):
+    return f"{case.n}x{case.m}/{case.agent_amount}/{case.lower_goal_amount}-{case.upper_goal_amount}"
+
+
+def corpus_path(directory, case, instances, seed, implicit):
+    """ The file of the pinned corpus of a case """
+    kind = "grid" if implicit else "dict"
+    return os.path.join(directory, f"{case.n}x{case.m}_{case.agent_amount}_{case.lower_goal_amount}-"
+                                   f"{case.upper_goal_amount}_{instances}_{seed}_{kind}.bin")
+
+
+def run_case(case, instances, seed, max_rounds, implicit=False, corpus=None, memory=True, repeats=REPEATS):
+    """
+    Generates and solves the instances seed to seed + instances - 1 of a case and returns its metrics.
+    With a corpus directory the instances are generated once and saved there. Every run solves the
+    instances loaded from the corpus then, so the generate times are None, if the corpus already existed.
+    Everything is timed repeats times and the fastest run of every time is kept. The noise of a time
+    is the relative distance of its median to the fastest run, compare does not report changes below it
+    """
+    path = corpus_path(corpus, case, instances, seed, implicit) if corpus is not None else None
+    generated = path is None or not os.path.exists(path)
+    data = None
+    runs = []
+    for repeat in range(0, repeats):
+        timings = {step: None for step in GENERATION_STEPS}
+        if generated:
+            timings = {step: 0.0 for step in GENERATION_STEPS}
+            instances_data = [generate_problem_instance(*case, implicit=implicit, seed=seed + i, timings=timings)
+                              for i in range(0, instances)]
+            if data is None:
+                data = instances_data
+                if path is not None:
+                    save_instances(path, data)
+        if repeat == 0 and path is not None:
+            data = load_instances(path)
+        # the instances are the same in every repeat, so are the results and counters of the solver
+        metrics = solve_instances(data, max_rounds)
+        metrics.update(timings)
+        metrics["generate"] = sum(timings.values()) if generated else None
+        runs.append(metrics)
+    metrics = runs[0]
+    metrics["instances"] = instances
+    metrics["noise"] = {}
+    for name in TIMES:
+        if metrics[name] is None:
+            continue
+        times = [run[name] for run in runs]
+        metrics[name] = min(times)
+        metrics["noise"][name] = median(times) / metrics[name] - 1 if metrics[name] > 0 else 0.0
+    # the throughput of the solver, the generator is timed on its own
+    total = metrics["initialize"] + metrics["solve"]
+    metrics["instances_per_second"] = instances / total if total > 0 else None
+    metrics["rounds_per_second"] = metrics["rounds"] / metrics["solve"] if metrics["solve"] > 0 else None
+    metrics["noise"]["instances_per_second"] = max(metrics["noise"]["initialize"], metrics["noise"]["solve"])
+    metrics["noise"]["rounds_per_second"] = metrics["noise"]["solve"]
+    metrics["peak_memory"] = peak_memory(case, seed, max_rounds, implicit) if memory else None
+    return metrics
+
+
+def solve_instances(data, max_rounds):
+    """ Initializes and solves all instances of data and returns the results, times and counters """
+    stats = SolveStats()
+    initialize_time = 0.0
+    solve_time = 0.0
+    solved = 0
+    errors = 0
+    for instance in data:
+        start = time.perf_counter()
+        try:
+            agents, collisions = initialize(instance)
+            initialized = time.perf_counter()
+            initialize_time += initialized - start
+            result, result_rounds = solve(agents, max_rounds, False, stats=stats)
+            if result:
+                solved += 1
+        except Exception:
+            # e.g. a NoPathError, when a finished agent cuts the graph in two
+            errors += 1
+            initialized = start
+        solve_time += time.perf_counter() - initialized
+    metrics = {"solved": solved, "errors": errors, "rounds": stats.rounds, "initialize": initialize_time,
+               "solve": solve_time}
+    for name in COUNTERS:
+        metrics[name] = getattr(stats, name)
+    return metrics
+
+
+def peak_memory(case, seed, max_rounds, implicit):
+    """
+    Returns the peak of the allocated bytes while generating, initializing and solving
+    the first instance of a case. It is measured in an own run, because tracing slows everything down
+    """
+    tracemalloc.start()
+    try:
+        instance = generate_problem_instance(*case, implicit=implicit, seed=seed)
+        agents, collisions = initialize(instance)
+        solve(agents, max_rounds, False)
+    except Exception:
+        pass
+    finally:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return peak
+
+
+def run_benchmarks(cases, instances, seed=0, max_rounds=100, implicit=False, corpus=None, memory=True,
+                   report=None, repeats=REPEATS):
+    """ Runs all cases and returns the baseline dict, report(case, metrics) is called after every case """
+    results = {}
+    for case in cases:
+        metrics = run_case(case, instances, seed, max_rounds, implicit, corpus, memory, repeats)
+        results[case_name(case)] = {"case": case._asdict(), "metrics": metrics}
+        if report is not None:
+            report(case, metrics)
+    return {"version": BASELINE_VERSION, "python": platform.python_version(),
+            "settings": {"instances": instances, "seed": seed, "max_rounds": max_rounds, "implicit": implicit,
+                         "repeats": repeats},
+            "cases": results}
+
+
+def compare(baseline, current, threshold):
+    """
+    Returns a list of (case, metric, baseline value, current value, relative change) of all times that grew
+    and all throughputs that dropped by more than threshold (0.1 is 10%).
+    A metric, which was noisier than that in the baseline or in the current run, is given its noise
+    as threshold, so the noise is not reported as regression
+    """
+    regressions = []
+    for name, entry in current["cases"].items():
+        if name not in baseline["cases"]:
+            continue
+        old = baseline["cases"][name]["metrics"]
+        new = entry["metrics"]
+        for metric in TIMES + THROUGHPUTS:
+            if not old.get(metric) or new.get(metric) is None:
+                continue
+            change = new[metric] / old[metric] - 1
+            if metric in THROUGHPUTS:
+                change = -change
+            if change > max(threshold, old.get("noise", {}).get(metric, 0.0), new["noise"].get(metric, 0.0)):
+                regressions.append((name, metric, old[metric], new[metric], change))
+    return regressions
+
+
+def format_metrics(case, metrics):
+    """ Returns one line of the report """
+    memory = f"{metrics['peak_memory'] / 2 ** 20:.1f}MiB" if metrics["peak_memory"] is not None else "-"
+    rounds = f"{metrics['rounds_per_second']:.0f}" if metrics["rounds_per_second"] is not None else "-"
+    generate = f"{metrics['generate']:.3f}s" if metrics["generate"] is not None else "-"
+    instances = f"{metrics['instances_per_second']:.1f}" if metrics["instances_per_second"] is not None else "-"
+    return (f"{case_name(case)}\tsolved {metrics['solved']}/{metrics['instances']}\t"
+            f"generate {generate}\tinitialize {metrics['initialize']:.3f}s\t"
+            f"solve {metrics['solve']:.3f}s\t{instances} instances/s\t"
+            f"{rounds} rounds/s\t{metrics['path_queries']} path queries\t{memory}\t"
+            f"solve noise {metrics['noise']['solve']:.0%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Times the generator and the solver on seeded instances")
+    parser.add_argument("--sizes", nargs="+", default=["10x10", "20x20", "50x50"], help="grid sizes as NxM")
+    parser.add_argument("--agents", nargs="+", type=int, default=[2, 10, 50], help="agent amounts")
+    parser.add_argument("--goals", nargs="+", default=["1-3"], help="goal bounds per agent as LOWER-UPPER")
+    parser.add_argument("--instances", type=int, default=5, help="instances per case")
+    parser.add_argument("--repeats", type=int, default=REPEATS, help="runs per case, the fastest one counts")
+    parser.add_argument("--max-rounds", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--implicit", action="store_true", help="use GridGraphs, e.g. for 500x500")
+    parser.add_argument("--corpus", default=None, help="directory of the pinned instance corpora")
+    parser.add_argument("--no-memory", action="store_true", help="do not measure the peak memory")
+    parser.add_argument("--save", default=None, help="write the results as JSON baseline")
+    parser.add_argument("--compare", default=None, help="JSON baseline to compare the results with")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="relative change counted as regression, at least the noise of a case")
+    args = parser.parse_args(argv)
+    cases = scaling_cases([parse_pair(size, "x") for size in args.sizes], args.agents,
+                          [parse_pair(bounds, "-") for bounds in args.goals])
+    if args.corpus is not None:
+        os.makedirs(args.corpus, exist_ok=True)
+    results = run_benchmarks(cases, args.instances, args.seed, args.max_rounds, args.implicit, args.corpus,
+                             not args.no_memory, lambda case, metrics: print(format_metrics(case, metrics)),
+                             args.repeats)
+    if args.save is not None:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.compare is not None:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressions = compare(baseline, results, args.threshold)
+        for name, metric, old, new, change in regressions:
+            print(f"REGRESSION {name} {metric}: {old:.4f} -> {new:.4f} ({change:+.0%})")
+        if regressions:
+            return 1
+        print(f"no regressions above {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
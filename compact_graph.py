@@ -0,0 +1,136 @@
+# Copyright 2019 (C) Lukas Berger [lukas.berger@uranus.uni-freiburg.de]
+
+from array import array
+from collections.abc import Mapping
+
+
+class CompactGraph(Mapping):
+    """
+    Undirected graph stored in compressed sparse row (CSR) form: the neighbors of vertex v are
+    targets[offsets[v]:offsets[v + 1]]. Deleted vertices are only marked in the removed mask,
+    so the arrays themselves never change.
+    It can be read like the dictionaries of the GraphGenerator (graph[v], v in graph, graph.keys()),
+    but vertices can only be deleted with remove_vertex (or GraphGenerator.delete_vertex).
+    """
+
+    def __init__(self, offsets, targets, removed=None):
+        self.offsets = offsets
+        self.targets = targets
+        self.capacity = len(offsets) - 1
+        if removed is None:
+            removed = bytearray(self.capacity)
+        self.removed = removed
+        self.size = self.capacity - sum(removed)
+        # counts the deleted vertices, so caches can tell if the graph changed
+        self.version = 0
+
+    @classmethod
+    def from_dict(cls, graph):
+        """ Builds the compact graph of a dictionary graph with integer vertices """
+        capacity = max(graph.keys()) + 1 if len(graph) > 0 else 0
+        offsets = array("i", [0]) * (capacity + 1)
+        targets = array("i")
+        removed = bytearray(b"\x01") * capacity
+        for vertex in range(0, capacity):
+            if vertex in graph:
+                removed[vertex] = 0
+                targets.extend(graph[vertex])
+            offsets[vertex + 1] = len(targets)
+        return cls(offsets, targets, removed)
+
+    def __getitem__(self, vertex):
+        if vertex not in self:
+            raise KeyError(vertex)
+        removed = self.removed
+        return tuple(neighbor for neighbor in self.targets[self.offsets[vertex]:self.offsets[vertex + 1]]
+                     if not removed[neighbor])
+
+    def __contains__(self, vertex):
+        return isinstance(vertex, int) and 0 <= vertex < self.capacity and not self.removed[vertex]
+
+    def __iter__(self):
+        removed = self.removed
+        return (vertex for vertex in range(0, self.capacity) if not removed[vertex])
+
+    def __len__(self):
+        return self.size
+
+    def remove_vertex(self, vertex):
+        """ Deletes a vertex by marking it as removed """
+        if vertex not in self:
+            raise KeyError(vertex)
+        self.removed[vertex] = 1
+        self.size -= 1
+        self.version += 1
+
+    def copy(self):
+        """ Returns a copy, which shares the arrays but has its own removed mask """
+        return CompactGraph(self.offsets, self.targets, bytearray(self.removed))
+
+    def to_dict(self):
+        """ Returns the graph as a dictionary of vertex sets """
+        return {vertex: set(self[vertex]) for vertex in self}
+
+
+class GridGraph(Mapping):
+    """
+    Implicit 4-connected grid graph of width m and height n, vertices are numbered like
+    GraphGenerator.map_positions(x, y, m). The adjacency is never stored, neighbors are computed
+    from the vertex number, only blocked (or deleted) cells are kept in a bitmap with one bit per cell.
+    It can be read like the dictionaries of the GraphGenerator, see CompactGraph.
+    """
+
+    def __init__(self, m, n, blocked=None):
+        self.m = m
+        self.n = n
+        self.capacity = m * n
+        if blocked is None:
+            blocked = bytearray((self.capacity + 7) // 8)
+        self.blocked = blocked
+        self.size = self.capacity - bin(int.from_bytes(blocked, "little")).count("1")
+        # counts the deleted vertices, so caches can tell if the graph changed
+        self.version = 0
+
+    def is_blocked(self, vertex):
+        """ Tests whether the cell is blocked """
+        return self.blocked[vertex >> 3] >> (vertex & 7) & 1
+
+    def __getitem__(self, vertex):
+        if vertex not in self:
+            raise KeyError(vertex)
+        m = self.m
+        blocked = self.blocked
+        x = vertex % m
+        neighbors = []
+        for neighbor, inside in ((vertex - 1, x != 0), (vertex - m, vertex >= m),
+                                 (vertex + 1, x != m - 1), (vertex + m, vertex + m < self.capacity)):
+            if inside and not blocked[neighbor >> 3] >> (neighbor & 7) & 1:
+                neighbors.append(neighbor)
+        return tuple(neighbors)
+
+    def __contains__(self, vertex):
+        return (isinstance(vertex, int) and 0 <= vertex < self.capacity
+                and not self.blocked[vertex >> 3] >> (vertex & 7) & 1)
+
+    def __iter__(self):
+        blocked = self.blocked
+        return (vertex for vertex in range(0, self.capacity) if not blocked[vertex >> 3] >> (vertex & 7) & 1)
+
+    def __len__(self):
+        return self.size
+
+    def remove_vertex(self, vertex):
+        """ Deletes a vertex by blocking its cell """
+        if vertex not in self:
+            raise KeyError(vertex)
+        self.blocked[vertex >> 3] |= 1 << (vertex & 7)
+        self.size -= 1
+        self.version += 1
+
+    def copy(self):
+        """ Returns a copy with its own bitmap """
+        return GridGraph(self.m, self.n, bytearray(self.blocked))
+
+    def to_dict(self):
+        """ Returns the graph as a dictionary of vertex sets """
+        return {vertex: set(self[vertex]) for vertex in self}
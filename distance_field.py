@@ -0,0 +1,177 @@
+# Copyright 2019 (C) Lukas Berger [lukas.berger@uranus.uni-freiburg.de]
+
+from array import array
+from collections import deque
+from heapq import heappush, heappop
+from shortest_path import NoPathError
+from compact_graph import CompactGraph
+
+UNREACHABLE = -1
+
+
+class DistanceFieldCache:
+    """
+    Caches the distance of every vertex to a goal (a distance field), computed
+    by one reverse BFS per goal. Paths to a goal are extracted by walking
+    down the field, so every edge is expected to have the weight 1 and the graph
+    has to be undirected. Vertices have to be numbered by integers, like the grids
+    of the GraphGenerator.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.fields = {}
+        self.size = len(graph)
+        # work counters: fields built, vertices reached by the builds and distances changed by repairs
+        self.builds = 0
+        self.expanded = 0
+        self.repaired = 0
+        if hasattr(graph, "capacity"):
+            self.capacity = graph.capacity
+        else:
+            self.capacity = max(graph.keys()) + 1 if self.size > 0 else 0
+
+    def field(self, goal):
+        """ Returns the distance field of goal as an array indexed by vertex """
+        if len(self.graph) != self.size:
+            # vertices were deleted without telling the cache
+            self.clear()
+        field = self.fields.get(goal)
+        if field is None:
+            if goal not in self.graph:
+                raise NoPathError(f"goal {goal} is not part of the graph")
+            field = self.build_field(goal)
+            self.builds += 1
+            self.expanded += len(field) - field.count(UNREACHABLE)
+            self.fields[goal] = field
+        return field
+
+    def build_field(self, goal):
+        """ Reverse BFS from goal """
+        field = array("i", [UNREACHABLE]) * self.capacity
+        field[goal] = 0
+        if isinstance(self.graph, CompactGraph):
+            build_csr_field(self.graph, field, goal)
+            return field
+        queue = deque([goal])
+        while queue:
+            u = queue.popleft()
+            distance = field[u] + 1
+            for neighbor in self.graph[u]:
+                if field[neighbor] == UNREACHABLE:
+                    field[neighbor] = distance
+                    queue.append(neighbor)
+        return field
+
+    def distance(self, start, goal):
+        """ Returns the number of edges on the shortest path from start to goal or -1 if there is none """
+        field = self.field(goal)
+        if not 0 <= start < self.capacity:
+            return UNREACHABLE
+        return field[start]
+
+    def path(self, start, goal):
+        """ Returns the shortest path from start to goal as a list """
+        field = self.field(goal)
+        distance = self.distance(start, goal)
+        if distance == UNREACHABLE:
+            raise NoPathError(f"goal {goal} is not reachable from {start}")
+        path = [start]
+        u = start
+        while distance > 0:
+            distance -= 1
+            for neighbor in self.graph[u]:
+                if field[neighbor] == distance:
+                    u = neighbor
+                    break
+            path.append(u)
+        return path
+
+    def find_path(self, graph, start, goal):
+        """ path as path_finder(graph, start, goal), graph has to be the graph of the cache """
+        return self.path(start, goal)
+
+    def vertex_deleted(self, vertex, neighbors):
+        """
+        Has to be called after vertex got deleted from the graph, neighbors are its former neighbors.
+        The fields are repaired instead of being recomputed, only the field of the vertex itself is dropped.
+        """
+        if len(self.graph) != self.size - 1:
+            self.clear()
+            return
+        self.size = len(self.graph)
+        for goal, field in list(self.fields.items()):
+            if goal == vertex:
+                del self.fields[goal]
+            else:
+                self.repaired += repair_field(self.graph, field, vertex, neighbors)
+
+    def clear(self):
+        """ Drops all fields """
+        self.fields = {}
+        self.size = len(self.graph)
+
+
+def build_csr_field(graph, field, goal):
+    """ Reverse BFS from goal, which reads the arrays of a CompactGraph directly """
+    offsets = graph.offsets
+    targets = graph.targets
+    removed = graph.removed
+    queue = deque([goal])
+    while queue:
+        u = queue.popleft()
+        distance = field[u] + 1
+        for i in range(offsets[u], offsets[u + 1]):
+            neighbor = targets[i]
+            if field[neighbor] == UNREACHABLE and not removed[neighbor]:
+                field[neighbor] = distance
+                queue.append(neighbor)
+
+
+def repair_field(graph, field, vertex, neighbors):
+    """
+    Repairs field after vertex got deleted, like the backward search of D* Lite.
+    First the vertices that lost every shortest path to the goal are collected,
+    then only their distances are searched again, starting from the unaffected vertices around them.
+    Returns the amount of vertices whose distance changed
+    """
+    distance = field[vertex]
+    field[vertex] = UNREACHABLE
+    if distance == UNREACHABLE:
+        return 0
+    lost = set()
+    checked = set()
+    queue = deque(neighbor for neighbor in neighbors if field[neighbor] == distance + 1)
+    # vertices are checked level by level, so all predecessors of a vertex are known to be lost or not
+    while queue:
+        u = queue.popleft()
+        if u in checked:
+            continue
+        checked.add(u)
+        predecessor = field[u] - 1
+        if not any(field[v] == predecessor and v not in lost for v in graph[u]):
+            lost.add(u)
+            for v in graph[u]:
+                if field[v] == predecessor + 2:
+                    queue.append(v)
+    if not lost:
+        return 0
+    for u in lost:
+        field[u] = UNREACHABLE
+    heap = []
+    for u in lost:
+        best = None
+        for v in graph[u]:
+            if field[v] != UNREACHABLE and (best is None or field[v] < best):
+                best = field[v]
+        if best is not None:
+            heappush(heap, (best + 1, u))
+    while heap:
+        distance, u = heappop(heap)
+        if field[u] != UNREACHABLE:
+            continue
+        field[u] = distance
+        for v in graph[u]:
+            if v in lost and field[v] == UNREACHABLE:
+                heappush(heap, (distance + 1, v))
+    return len(lost)
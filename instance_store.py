@@ -0,0 +1,161 @@
+# Copyright 2019 (C) Lukas Berger [lukas.berger@uranus.uni-freiburg.de]
+
+import mmap
+import struct
+import sys
+from array import array
+from compact_graph import CompactGraph, GridGraph
+
+MAGIC = b"MAPFINS1"
+INDEX = b"INDX"
+BYTE_ORDER = b"<" if sys.byteorder == "little" else b">"
+# kinds of the stored graphs
+CSR = 0
+GRID = 1
+# kind, capacity, m, n (only for grids), width, agent amount, goal amount, edge amount,
+# path size (-1 without paths) and collisions
+HEADER = struct.Struct("=biiiiiiiiq")
+TRAILER = struct.Struct("=QQ")
+# stands for None in the header
+MISSING = -1
+
+
+def save_instances(path, instances, paths=True):
+    """
+    Writes the instances of generate_problem_instance (or movingai.generate_instance) into one corpus file.
+    Every instance is a record of flat int32 arrays: the graph in CSR form (or the bitmap of a GridGraph),
+    the agents, real goals and goals and, with paths=True, the paths of data["Paths"].
+    An index at the end of the file lets load_instances read any slice without touching the other records
+    """
+    offsets = array("q")
+    with open(path, "wb") as file:
+        file.write(MAGIC + BYTE_ORDER)
+        offset = len(MAGIC) + 1
+        for data in instances:
+            record = write_instance(data, paths)
+            offsets.append(offset)
+            file.write(record)
+            offset += len(record)
+        file.write(INDEX + offsets.tobytes() + TRAILER.pack(offset, len(offsets)))
+    return len(offsets)
+
+
+def load_instances(path, start=0, stop=None, paths=True):
+    """
+    Returns the instances start to stop of a corpus as dicts for Solver.initialize.
+    The graphs are CompactGraphs (or GridGraphs), the file is memory mapped, so only the index
+    and the records of the slice are read
+    """
+    with open(path, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            index = read_index(data, path)
+            instances = []
+            for offset in index[start:stop]:
+                instances.append(read_instance(data, offset, paths))
+    return instances
+
+
+def count_instances(path):
+    """ Returns the amount of instances in a corpus """
+    with open(path, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return len(read_index(data, path))
+
+
+def read_index(data, path):
+    """ Checks the header of a corpus and returns the offsets of its records """
+    if data[0:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is no instance corpus")
+    if data[len(MAGIC):len(MAGIC) + 1] != BYTE_ORDER:
+        raise ValueError(f"{path} was written on a machine with a different byte order")
+    index_offset, count = TRAILER.unpack_from(data, len(data) - TRAILER.size)
+    if data[index_offset:index_offset + len(INDEX)] != INDEX:
+        raise ValueError(f"{path} has no index, it was not written completely")
+    index = array("q")
+    first = index_offset + len(INDEX)
+    index.frombytes(data[first:first + count * index.itemsize])
+    return index
+
+
+def write_instance(data, paths=True):
+    """ Returns the record of an instance as bytes """
+    graph = data["graph"]
+    if isinstance(graph, GridGraph):
+        kind, m, n = GRID, graph.m, graph.n
+        sections = [bytes(graph.blocked)]
+        edge_amount = 0
+    else:
+        if not isinstance(graph, CompactGraph):
+            graph = CompactGraph.from_dict(graph)
+        kind, m, n = CSR, 0, 0
+        sections = [graph.offsets.tobytes(), graph.targets.tobytes(), bytes(graph.removed)]
+        edge_amount = len(graph.targets)
+    goal_offsets = array("i", [0])
+    goals = array("i")
+    for goal_set in data["goals"]:
+        goals.extend(goal_set)
+        goal_offsets.append(len(goals))
+    sections += [array("i", data["agents"]).tobytes(), array("i", data["real_goals"]).tobytes(),
+                 goal_offsets.tobytes(), goals.tobytes()]
+    path_size = MISSING
+    if paths and data.get("Paths") is not None:
+        path_offsets = array("i", [0])
+        vertices = array("i")
+        for goal_set, agent_paths in zip(data["goals"], data["Paths"]):
+            for goal in goal_set:
+                vertices.extend(agent_paths[goal])
+                path_offsets.append(len(vertices))
+        path_size = len(vertices)
+        sections += [path_offsets.tobytes(), vertices.tobytes()]
+    width = data.get("width")
+    collisions = data.get("collisions")
+    header = HEADER.pack(kind, graph.capacity, m, n, MISSING if width is None else width, len(data["agents"]),
+                         len(goals), edge_amount, path_size, MISSING if collisions is None else collisions)
+    return header + b"".join(sections)
+
+
+def read_instance(data, offset, paths=True):
+    """ Reads the record at offset and returns the instance """
+    (kind, capacity, m, n, width, agent_amount, goal_amount, edge_amount,
+     path_size, collisions) = HEADER.unpack_from(data, offset)
+    offset += HEADER.size
+
+    def read(typecode, amount):
+        nonlocal offset
+        values = array(typecode)
+        size = amount * values.itemsize
+        values.frombytes(data[offset:offset + size])
+        offset += size
+        return values
+
+    if kind == GRID:
+        size = (capacity + 7) // 8
+        graph = GridGraph(m, n, bytearray(data[offset:offset + size]))
+        offset += size
+    else:
+        graph_offsets = read("i", capacity + 1)
+        targets = read("i", edge_amount)
+        graph = CompactGraph(graph_offsets, targets, bytearray(data[offset:offset + capacity]))
+        offset += capacity
+    agents = tuple(read("i", agent_amount))
+    real_goals = tuple(read("i", agent_amount))
+    goal_offsets = read("i", agent_amount + 1)
+    goals = read("i", goal_amount)
+    goal_sets = tuple(set(goals[goal_offsets[i]:goal_offsets[i + 1]]) for i in range(0, agent_amount))
+    instance = {}
+    instance["collisions"] = None if collisions == MISSING else collisions
+    instance["goals"] = goal_sets
+    if paths and path_size != MISSING:
+        path_offsets = read("i", goal_amount + 1)
+        vertices = read("i", path_size)
+        agent_paths = []
+        for i in range(0, agent_amount):
+            agent_paths.append({goals[j]: vertices[path_offsets[j]:path_offsets[j + 1]].tolist()
+                                for j in range(goal_offsets[i], goal_offsets[i + 1])})
+        instance["Paths"] = tuple(agent_paths)
+    instance["real_goals"] = real_goals
+    instance["agents"] = agents
+    instance["graph"] = graph
+    if width != MISSING:
+        instance["width"] = width
+    return instance
@@ -0,0 +1,97 @@
+# Copyright 2019 (C) Lukas Berger [lukas.berger@uranus.uni-freiburg.de]
+# see https://movingai.com/benchmarks/formats.html for the map and scenario formats
+
+import mmap
+import random
+from compact_graph import GridGraph
+from GraphGenerator import map_positions, get_collisions
+
+# '.', 'G' and 'S' can be passed, everything else ('@', 'O', 'T', 'W') is blocked
+PASSABLE = b".GS"
+BLOCKED_TABLE = bytes(ord("0") if bytes([c]) in PASSABLE else ord("1") for c in range(256))
+
+
+def load_map(path):
+    """
+    Loads a .map file as a GridGraph. The file is memory mapped and the cells are
+    packed into the blocked bitmap directly, without creating an entry per cell
+    """
+    with open(path, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            height = None
+            width = None
+            offset = 0
+            while True:
+                end = data.find(b"\n", offset)
+                if end == -1:
+                    raise ValueError(f"{path} has no map section")
+                line = data[offset:end].strip()
+                offset = end + 1
+                if line.startswith(b"height"):
+                    height = int(line.split()[1])
+                elif line.startswith(b"width"):
+                    width = int(line.split()[1])
+                elif line == b"map":
+                    break
+            if height is None or width is None:
+                raise ValueError(f"{path} has no height or width")
+            cells = data[offset:].translate(None, b"\r\n")[:width * height]
+    if len(cells) != width * height:
+        raise ValueError(f"{path} has less than {width} x {height} cells")
+    # bit i of the bitmap is cell i, so the digits are reversed before reading them as binary number
+    bits = cells.translate(BLOCKED_TABLE)[::-1]
+    blocked = bytearray(int(bits, 2).to_bytes((width * height + 7) // 8, "little"))
+    return GridGraph(width, height, blocked)
+
+
+def load_scenario(path):
+    """ Loads a .scen file as a list of (start, goal) vertices """
+    entries = []
+    with open(path) as file:
+        for line in file:
+            fields = line.split("\t")
+            if len(fields) < 9:
+                # the version line
+                continue
+            width = int(fields[2])
+            start = map_positions(int(fields[4]), int(fields[5]), width)
+            goal = map_positions(int(fields[6]), int(fields[7]), width)
+            entries.append((start, goal))
+    return entries
+
+
+def generate_instance(graph, scenario, agent_amount, decoy_goals=0, seed=None, collisions=False):
+    """
+    Generates the data for Solver.initialize out of the first agent_amount entries of a scenario.
+    Every agent gets decoy_goals random goals besides its real goal, no two goals share a vertex.
+    The collisions are only counted with collisions=True, because that searches a path to every goal
+    """
+    if agent_amount > len(scenario):
+        raise ValueError(f"The scenario has only {len(scenario)} agents")
+    rng = random.Random(seed)
+    agents = tuple(start for start, goal in scenario[0:agent_amount])
+    real_goals = tuple(goal for start, goal in scenario[0:agent_amount])
+    for vertex in agents + real_goals:
+        if vertex not in graph:
+            raise ValueError(f"{vertex} is blocked in the map")
+    if len(graph) < len(real_goals) * (decoy_goals + 1):
+        raise ValueError("You cannot put more goals into the graph,than verticies itself")
+    taken = set(real_goals)
+    goals = []
+    for real_goal in real_goals:
+        goal_set = {real_goal}
+        while len(goal_set) <= decoy_goals:
+            goal = rng.randrange(0, graph.capacity)
+            if goal not in taken and goal in graph:
+                taken.add(goal)
+                goal_set.add(goal)
+        goals.append(goal_set)
+    goals = tuple(goals)
+    data = {}
+    data["collisions"] = get_collisions(graph, agents, goals) if collisions else None
+    data["goals"] = goals
+    data["real_goals"] = real_goals
+    data["agents"] = agents
+    data["graph"] = graph
+    data["width"] = graph.m
+    return data
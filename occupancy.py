@@ -0,0 +1,47 @@
+# Copyright 2019 (C) Lukas Berger [lukas.berger@uranus.uni-freiburg.de]
+
+from array import array
+
+FREE = -1
+
+
+class AlreadyTakenError(Exception):
+    pass
+
+
+class OccupancyIndex:
+    """
+    Shared map of vertex to the id of the agent on it, so testing whether a vertex is occupied
+    costs O(1) instead of a loop over all agents. Vertices have to be numbered by integers,
+    like the grids of the GraphGenerator. Every agent is placed once and then only moved,
+    an agent moving onto an occupied vertex raises an AlreadyTakenError.
+    """
+
+    def __init__(self, graph):
+        if hasattr(graph, "capacity"):
+            capacity = graph.capacity
+        else:
+            capacity = max(graph.keys()) + 1 if len(graph) > 0 else 0
+        self.agents = array("i", [FREE]) * capacity
+        self.positions = {}
+
+    def place(self, agent_id, vertex):
+        """ Puts an agent on its start vertex """
+        if self.agents[vertex] != FREE:
+            raise AlreadyTakenError(f"Agent {agent_id} and Agent {self.agents[vertex]} are on the same position")
+        self.agents[vertex] = agent_id
+        self.positions[agent_id] = vertex
+
+    def move(self, agent_id, vertex):
+        """ Moves an agent from its position to vertex """
+        if self.agents[vertex] != FREE:
+            raise AlreadyTakenError(f"Invalid move from agent {agent_id}, "
+                                    f"{vertex} is already taken by {self.agents[vertex]}")
+        self.agents[self.positions[agent_id]] = FREE
+        self.agents[vertex] = agent_id
+        self.positions[agent_id] = vertex
+
+    def agent_at(self, vertex):
+        """ Returns the id of the agent on vertex or None """
+        agent_id = self.agents[vertex]
+        return None if agent_id == FREE else agent_id
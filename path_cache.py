@@ -0,0 +1,62 @@
+# Copyright 2019 (C) Lukas Berger [lukas.berger@uranus.uni-freiburg.de]
+
+from collections import OrderedDict
+
+# vertices of all cached paths kept at most, the least recently used paths are dropped first
+MAX_VERTICES = 1 << 20
+
+
+class PathCache:
+    """
+    LRU cache of shortest paths shared by all agents, in front of their path finders.
+    A path is keyed by (graph version, path finder, start, goal) and the version is increased with
+    every deleted vertex, so a path is never returned after the graph changed. The paths are
+    returned as tuples, so no caller can change a cached path. The cache is bounded by the
+    amount of vertices on the cached paths and counts its hits, misses and evictions.
+    """
+
+    def __init__(self, graph, max_vertices=MAX_VERTICES):
+        self.graph = graph
+        self.size = len(graph)
+        self.version = 0
+        self.max_vertices = max_vertices
+        self.vertices = 0
+        self.paths = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.paths)
+
+    def vertex_deleted(self):
+        """ Has to be called after a vertex got deleted from the graph """
+        self.version += 1
+        self.size = len(self.graph)
+
+    def path(self, finder, start, goal):
+        """ Returns the path of finder(graph, start, goal) as a tuple, a NoPathError of finder is not cached """
+        if len(self.graph) != self.size:
+            # vertices were deleted without telling the cache
+            self.version += 1
+            self.size = len(self.graph)
+        key = (self.version, finder, start, goal)
+        path = self.paths.get(key)
+        if path is not None:
+            self.paths.move_to_end(key)
+            self.hits += 1
+            return path
+        self.misses += 1
+        path = tuple(finder(self.graph, start, goal))
+        self.paths[key] = path
+        self.vertices += len(path)
+        while self.vertices > self.max_vertices and len(self.paths) > 1:
+            _, evicted = self.paths.popitem(last=False)
+            self.vertices -= len(evicted)
+            self.evictions += 1
+        return path
+
+    def clear(self):
+        """ Drops all paths """
+        self.paths.clear()
+        self.vertices = 0
@@ -0,0 +1,76 @@
+# Copyright 2019 (C) Lukas Berger [lukas.berger@uranus.uni-freiburg.de]
+
+from array import array
+
+
+def path_bits(path):
+    """ Returns the vertices of a path as bitset, bit v is set if vertex v is on the path """
+    if not path:
+        return 0
+    data = bytearray((max(path) >> 3) + 1)
+    for vertex in path:
+        data[vertex >> 3] |= 1 << (vertex & 7)
+    return int.from_bytes(data, "little")
+
+
+class PathIndex:
+    """
+    Index of paths keyed by (owner, goal). Every path is kept as a bitset, so testing two paths
+    for a common vertex is a bitwise and, and every vertex counts the paths it is on,
+    so whether a vertex is on the path of another owner can be read off directly.
+    Paths can be added, replaced and removed one by one when they change.
+    Vertices have to be numbered by integers, like the grids of the GraphGenerator.
+    """
+
+    def __init__(self, graph):
+        if hasattr(graph, "capacity"):
+            capacity = graph.capacity
+        else:
+            capacity = max(graph.keys()) + 1 if len(graph) > 0 else 0
+        self.count = array("i", [0]) * capacity
+        self.paths = {}
+        self.bits = {}
+        self.owners = {}
+
+    def add(self, key, path):
+        """ Adds the path of key, a path that is already there is replaced """
+        if key in self.paths:
+            self.remove(key)
+        path = tuple(path)
+        count = self.count
+        for vertex in path:
+            count[vertex] += 1
+        self.paths[key] = path
+        self.bits[key] = path_bits(path)
+        self.owners.setdefault(key[0], set()).add(key)
+
+    def remove(self, key):
+        """ Removes the path of key """
+        path = self.paths.pop(key)
+        count = self.count
+        for vertex in path:
+            count[vertex] -= 1
+        del self.bits[key]
+        keys = self.owners[key[0]]
+        keys.discard(key)
+        if not keys:
+            del self.owners[key[0]]
+
+    def remove_owner(self, owner):
+        """ Removes all paths of owner """
+        for key in list(self.owners.get(owner, ())):
+            self.remove(key)
+
+    def collides(self, bits, keys):
+        """ Tests whether a bitset shares a vertex with one of the paths of keys """
+        for key in keys:
+            if bits & self.bits.get(key, 0):
+                return True
+        return False
+
+    def is_covered_by_others(self, vertex, owner):
+        """ Tests whether vertex is on a path, which does not belong to owner """
+        own = 0
+        for key in self.owners.get(owner, ()):
+            own += self.bits[key] >> vertex & 1
+        return self.count[vertex] > own
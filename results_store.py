@@ -0,0 +1,164 @@
+# Copyright 2019 (C) Lukas Berger [lukas.berger@uranus.uni-freiburg.de]
+
+import os
+import struct
+import sys
+from array import array
+from collections import namedtuple
+
+# one point of a parameter sweep, the arguments of generate_problem_instance
+Config = namedtuple("Config", ["n", "m", "agent_amount", "lower_goal_amount", "upper_goal_amount"])
+Result = namedtuple("Result", ["config", "seed", "solved", "rounds", "collisions",
+                               "generate_time", "solve_time", "error"])
+MAGIC = b"MAPFRES1"
+CHUNK = b"CHNK"
+# name and array type code of every column, every chunk stores the columns one after another
+COLUMNS = (("n", "i"), ("m", "i"), ("agent_amount", "i"), ("lower_goal_amount", "i"),
+           ("upper_goal_amount", "i"), ("seed", "q"), ("solved", "b"), ("rounds", "i"),
+           ("collisions", "q"), ("generate_time", "d"), ("solve_time", "d"), ("error", "h"))
+# stands for None in the integer columns
+MISSING = -1
+BYTE_ORDER = b"<" if sys.byteorder == "little" else b">"
+
+
+class ResultStore:
+    """
+    Append-only store for the results of the runner. Every append writes one chunk, in which
+    every column is a contiguous array, so loading only reads a few arrays per chunk instead of
+    parsing every row. A chunk that was cut off by an interrupted sweep is dropped when the store is
+    opened again, so a sweep can always be resumed from the complete chunks.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, "wb") as file:
+                file.write(MAGIC + BYTE_ORDER)
+        else:
+            with open(path, "rb") as file:
+                header = file.read(len(MAGIC) + 1)
+            if header[0:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} is no result store")
+            if header[len(MAGIC):] != BYTE_ORDER:
+                raise ValueError(f"{path} was written on a machine with a different byte order")
+            self.truncate_incomplete_chunk()
+
+    def append(self, results):
+        """ Appends the results as one chunk and flushes it to the disk """
+        results = list(results)
+        if not results:
+            return
+        errors = sorted({result.error for result in results if result.error is not None})
+        codes = {error: code for code, error in enumerate(errors)}
+        rows = {name: [] for name, typecode in COLUMNS}
+        for result in results:
+            for name, value in zip(Config._fields, result.config):
+                rows[name].append(value)
+            rows["seed"].append(result.seed)
+            rows["solved"].append(1 if result.solved else 0)
+            rows["rounds"].append(MISSING if result.rounds is None else result.rounds)
+            rows["collisions"].append(MISSING if result.collisions is None else result.collisions)
+            rows["generate_time"].append(result.generate_time)
+            rows["solve_time"].append(result.solve_time)
+            rows["error"].append(MISSING if result.error is None else codes[result.error])
+        names = "\n".join(errors).encode()
+        chunk = [CHUNK, struct.pack("=II", len(results), len(names)), names]
+        for name, typecode in COLUMNS:
+            chunk.append(array(typecode, rows[name]).tobytes())
+        with open(self.path, "ab") as file:
+            file.write(b"".join(chunk))
+            file.flush()
+            os.fsync(file.fileno())
+
+    def chunks(self):
+        """ Yields every complete chunk as a dict of column arrays and the list of error names """
+        with open(self.path, "rb") as file:
+            data = file.read()
+        offset = len(MAGIC) + 1
+        while True:
+            chunk = read_chunk(data, offset)
+            if chunk is None:
+                return
+            columns, errors, offset = chunk
+            yield columns, errors
+
+    def load(self):
+        """
+        Returns all results as a dict of column name and array. Error codes are turned into
+        indices of the returned list of error names, -1 marks None in the integer columns
+        """
+        columns = {name: array(typecode) for name, typecode in COLUMNS}
+        errors = []
+        for chunk_columns, chunk_errors in self.chunks():
+            for error in chunk_errors:
+                if error not in errors:
+                    errors.append(error)
+            mapping = [errors.index(error) for error in chunk_errors]
+            for name, typecode in COLUMNS:
+                if name == "error" and mapping != list(range(len(mapping))):
+                    columns[name].extend(MISSING if code == MISSING else mapping[code]
+                                         for code in chunk_columns[name])
+                else:
+                    columns[name].extend(chunk_columns[name])
+        return columns, errors
+
+    def results(self):
+        """ Yields all stored results as Result tuples """
+        for columns, errors in self.chunks():
+            for i in range(0, len(columns["seed"])):
+                config = Config(*(columns[name][i] for name in Config._fields))
+                rounds = columns["rounds"][i]
+                collisions = columns["collisions"][i]
+                error = columns["error"][i]
+                yield Result(config, columns["seed"][i], columns["solved"][i] == 1,
+                             None if rounds == MISSING else rounds,
+                             None if collisions == MISSING else collisions,
+                             columns["generate_time"][i], columns["solve_time"][i],
+                             None if error == MISSING else errors[error])
+
+    def completed(self):
+        """ Returns the set of (config, seed) that are already stored """
+        done = set()
+        for columns, errors in self.chunks():
+            configs = zip(*(columns[name] for name in Config._fields))
+            for config, seed in zip(configs, columns["seed"]):
+                done.add((Config(*config), seed))
+        return done
+
+    def truncate_incomplete_chunk(self):
+        """ Cuts off a chunk at the end of the file, which was not written completely """
+        with open(self.path, "rb") as file:
+            data = file.read()
+        offset = len(MAGIC) + 1
+        while True:
+            chunk = read_chunk(data, offset)
+            if chunk is None:
+                break
+            offset = chunk[2]
+        if offset < len(data):
+            with open(self.path, "r+b") as file:
+                file.truncate(offset)
+
+
+def read_chunk(data, offset):
+    """ Reads the chunk at offset. Returns (columns, error names, end of the chunk) or None if it is incomplete """
+    header_size = len(CHUNK) + struct.calcsize("=II")
+    if offset + header_size > len(data) or data[offset:offset + len(CHUNK)] != CHUNK:
+        return None
+    count, names_size = struct.unpack_from("=II", data, offset + len(CHUNK))
+    offset += header_size
+    if offset + names_size > len(data):
+        return None
+    names = data[offset:offset + names_size].decode()
+    errors = names.split("\n") if names else []
+    offset += names_size
+    columns = {}
+    for name, typecode in COLUMNS:
+        column = array(typecode)
+        size = count * column.itemsize
+        if offset + size > len(data):
+            return None
+        column.frombytes(data[offset:offset + size])
+        columns[name] = column
+        offset += size
+    return columns, errors, offset
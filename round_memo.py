@@ -0,0 +1,46 @@
+# Copyright 2019 (C) Lukas Berger [lukas.berger@uranus.uni-freiburg.de]
+
+from collections import OrderedDict
+
+# entries kept at most, the least recently used ones are dropped first
+MEMO_SIZE = 1 << 16
+
+
+class RoundMemo:
+    """
+    Memo of the intermediate results of check_for_escaping within one round, shared by all agents,
+    e.g. the bitsets of the goal paths, which has_collision needs once per other agent.
+    Every key contains everything the result depends on (for a bitset the path itself),
+    so a move or a deleted vertex never hits an old entry. The paths themselves are cached by the PathCache.
+    Solver.solve clears it at the beginning of every round. It is bounded by an LRU size.
+    """
+
+    def __init__(self, size=MEMO_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def new_round(self):
+        """ Drops all entries of the last round """
+        self.entries.clear()
+
+    def get(self, key, function, *args):
+        """ Returns the memoized result of key, function(*args) computes and stores it, if there is none """
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        self.misses += 1
+        value = function(*args)
+        self.put(key, value)
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
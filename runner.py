@@ -0,0 +1,168 @@
+# Copyright 2019 (C) Lukas Berger [lukas.berger@uranus.uni-freiburg.de]
+
+import argparse
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from GraphGenerator import generate_problem_instance
+from Solver import initialize, solve, Livelock
+from results_store import Config, Result, ResultStore
+
+Summary = namedtuple("Summary", ["instances", "solved", "success_rate", "mean_rounds",
+                                 "mean_collisions", "errors", "livelocks", "wall_time"])
+
+
+def sweep(sizes, agent_amounts, goal_bounds):
+    """
+    Returns the configs of all combinations of grid sizes (n, m),
+    agent amounts and goal bounds (lower, upper)
+    """
+    configs = []
+    for n, m in sizes:
+        for agent_amount in agent_amounts:
+            for lower, upper in goal_bounds:
+                configs.append(Config(n, m, agent_amount, lower, upper))
+    return configs
+
+
+def work_units(configs, instances, seed, chunk_size, completed=frozenset()):
+    """
+    Splits the sweep into work units of up to chunk_size instances of the same config.
+    Instance i of every config is generated with the seed seed + i
+    (like GraphGenerator.generate_problem_instances), so the results
+    do not depend on the amount of workers or the chunk size.
+    Instances in completed, a set of (config, seed), are skipped
+    """
+    units = []
+    for config in configs:
+        seeds = [seed + i for i in range(0, instances) if (config, seed + i) not in completed]
+        for first in range(0, len(seeds), chunk_size):
+            units.append((config, seeds[first:first + chunk_size]))
+    return units
+
+
+def run_instance(config, seed, max_rounds):
+    """
+    Generates and solves one instance. For an unsolved instance, rounds is the round
+    in which a livelock was detected or None, if it ran out of rounds
+    """
+    start = time.perf_counter()
+    solved = False
+    rounds = None
+    collisions = None
+    error = None
+    generated = start
+    try:
+        instance = generate_problem_instance(*config, seed=seed)
+        generated = time.perf_counter()
+        agents, collisions = initialize(instance)
+        solved, rounds = solve(agents, max_rounds, False)
+        if isinstance(rounds, Livelock):
+            rounds = rounds.round
+    except Exception as exception:
+        # e.g. a NoPathError, when a finished agent cuts the graph in two
+        error = type(exception).__name__
+    end = time.perf_counter()
+    return Result(config, seed, solved, rounds, collisions, generated - start, end - generated, error)
+
+
+def run_unit(unit, max_rounds):
+    """ Runs all instances of a work unit, this is what a worker process executes """
+    config, seeds = unit
+    return [run_instance(config, seed, max_rounds) for seed in seeds]
+
+
+def run_sweep(configs, instances, max_rounds=100, seed=0, workers=None, chunk_size=None, store=None):
+    """
+    Generates and solves instances of every config on a process pool
+    and yields the results as soon as their work unit is done.
+    With a ResultStore, every finished work unit is appended to it and
+    the instances, which are already in the store, are skipped
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if chunk_size is None:
+        # a few units per worker, so small instances are not dominated by pickling
+        chunk_size = max(1, len(configs) * instances // (workers * 4))
+    completed = store.completed() if store is not None else frozenset()
+    units = work_units(configs, instances, seed, chunk_size, completed)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_unit, unit, max_rounds) for unit in units]
+        for future in as_completed(futures):
+            results = future.result()
+            if store is not None:
+                store.append(results)
+            for result in results:
+                yield result
+
+
+def aggregate(results):
+    """ Returns a dict of config and Summary of the results """
+    grouped = {}
+    for result in results:
+        grouped.setdefault(result.config, []).append(result)
+    summaries = {}
+    for config, group in grouped.items():
+        solved = [result for result in group if result.solved]
+        counted = [result.collisions for result in group if result.collisions is not None]
+        summaries[config] = Summary(
+            instances=len(group),
+            solved=len(solved),
+            success_rate=len(solved) / len(group),
+            mean_rounds=sum(result.rounds for result in solved) / len(solved) if solved else None,
+            mean_collisions=sum(counted) / len(counted) if counted else None,
+            errors=sum(1 for result in group if result.error is not None),
+            livelocks=sum(1 for result in group if not result.solved and result.rounds is not None),
+            wall_time=sum(result.generate_time + result.solve_time for result in group))
+    return summaries
+
+
+def format_summaries(summaries):
+    """ Returns the summaries as a table """
+    lines = ["n\tm\tagents\tgoals\tinstances\tsolved\trate\trounds\tcollisions\terrors\tlivelocks\ttime"]
+    for config in sorted(summaries):
+        summary = summaries[config]
+        rounds = f"{summary.mean_rounds:.1f}" if summary.mean_rounds is not None else "-"
+        collisions = f"{summary.mean_collisions:.1f}" if summary.mean_collisions is not None else "-"
+        lines.append(f"{config.n}\t{config.m}\t{config.agent_amount}\t"
+                     f"{config.lower_goal_amount}-{config.upper_goal_amount}\t{summary.instances}\t"
+                     f"{summary.solved}\t{summary.success_rate:.2f}\t{rounds}\t{collisions}\t{summary.errors}\t"
+                     f"{summary.livelocks}\t"
+                     f"{summary.wall_time:.2f}s")
+    return "\n".join(lines)
+
+
+def parse_pair(text, separator):
+    """ Parses e.g. '10x20' into (10, 20) """
+    first, second = text.split(separator)
+    return int(first), int(second)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generates and solves random instances on all cores")
+    parser.add_argument("--sizes", nargs="+", default=["10x10"], help="grid sizes as NxM")
+    parser.add_argument("--agents", nargs="+", type=int, default=[2], help="agent amounts")
+    parser.add_argument("--goals", nargs="+", default=["1-3"], help="goal bounds per agent as LOWER-UPPER")
+    parser.add_argument("--instances", type=int, default=100, help="instances per config")
+    parser.add_argument("--max-rounds", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="default: all cores")
+    parser.add_argument("--chunk-size", type=int, default=None, help="instances per work unit")
+    parser.add_argument("--store", default=None, help="result store to append to and resume from")
+    args = parser.parse_args(argv)
+    configs = sweep([parse_pair(size, "x") for size in args.sizes], args.agents,
+                    [parse_pair(bounds, "-") for bounds in args.goals])
+    store = ResultStore(args.store) if args.store is not None else None
+    start = time.perf_counter()
+    results = list(run_sweep(configs, args.instances, args.max_rounds, args.seed,
+                             args.workers, args.chunk_size, store))
+    print(f"{len(results)} instances in {time.perf_counter() - start:.2f}s")
+    if store is not None:
+        # the summary covers the resumed instances as well
+        results = [result for result in store.results() if result.config in configs]
+    print(format_summaries(aggregate(results)))
+
+
+if __name__ == "__main__":
+    main()
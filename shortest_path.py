@@ -0,0 +1,167 @@
+# Copyright 2019 (C) Lukas Berger [lukas.berger@uranus.uni-freiburg.de]
+
+from collections import deque
+from heapq import heappush, heappop
+from math import inf as infinity
+from compact_graph import CompactGraph
+
+
+class NoPathError(Exception):
+    """ Raised if the goal cannot be reached from the start """
+    pass
+
+
+def shortest_path(graph, start, goal, weight=None):
+    """
+    Returns the shortest path from start to goal as a list.
+    Without a weight function every edge counts 1 and a bidirectional BFS is used
+    (a BFS over the raw arrays for a CompactGraph),
+    otherwise weight(u, v) is the cost of the edge (u, v) and dijkstra is used.
+    """
+    if weight is None:
+        if isinstance(graph, CompactGraph):
+            return csr_bfs(graph, start, goal)
+        return bidirectional_bfs(graph, start, goal)
+    return weighted_dijkstra(graph, start, goal, weight)
+
+
+def check_endpoints(graph, start, goal):
+    """ Raises a NoPathError if start or goal are not part of the graph """
+    if start not in graph:
+        raise NoPathError(f"start {start} is not part of the graph")
+    if goal not in graph:
+        raise NoPathError(f"goal {goal} is not part of the graph")
+
+
+def csr_bfs(graph, start, goal):
+    """ Breadth first search, which reads the arrays of a CompactGraph directly """
+    check_endpoints(graph, start, goal)
+    offsets = graph.offsets
+    targets = graph.targets
+    removed = graph.removed
+    predecessors = {start: None}
+    queue = deque([start])
+    while queue:
+        u = queue.popleft()
+        if u == goal:
+            return build_path(goal, predecessors)
+        for i in range(offsets[u], offsets[u + 1]):
+            neighbor = targets[i]
+            if not removed[neighbor] and neighbor not in predecessors:
+                predecessors[neighbor] = u
+                queue.append(neighbor)
+    raise NoPathError(f"goal {goal} is not reachable from {start}")
+
+
+def bidirectional_bfs(graph, start, goal):
+    """
+    Breadth first search from both ends at the same time, which stops as soon
+    as both searches meet. The graph has to be undirected.
+    """
+    check_endpoints(graph, start, goal)
+    if start == goal:
+        return [start]
+    forward = {start: None}
+    backward = {goal: None}
+    forward_frontier = [start]
+    backward_frontier = [goal]
+    while forward_frontier and backward_frontier:
+        # always expand the smaller side, a whole level at a time
+        if len(forward_frontier) <= len(backward_frontier):
+            forward_frontier, meeting = expand_level(graph, forward_frontier, forward, backward)
+        else:
+            backward_frontier, meeting = expand_level(graph, backward_frontier, backward, forward)
+        if meeting is not None:
+            path = build_path(meeting, forward)
+            pred = backward[meeting]
+            while pred is not None:
+                path.append(pred)
+                pred = backward[pred]
+            return path
+    raise NoPathError(f"goal {goal} is not reachable from {start}")
+
+
+def expand_level(graph, frontier, visited, other_visited):
+    """
+    Expands every vertex of the frontier by one step.
+    Returns the next frontier and the vertex where both searches met (or None)
+    """
+    next_frontier = []
+    for u in frontier:
+        for neighbor in graph[u]:
+            if neighbor not in visited:
+                visited[neighbor] = u
+                if neighbor in other_visited:
+                    return next_frontier, neighbor
+                next_frontier.append(neighbor)
+    return next_frontier, None
+
+
+def weighted_dijkstra(graph, start, goal, weight):
+    """ Dijkstra with a binary heap for graphs with non negative edge weights """
+    check_endpoints(graph, start, goal)
+    distances = {start: 0}
+    predecessors = {start: None}
+    heap = [(0, start)]
+    while heap:
+        distance, u = heappop(heap)
+        if u == goal:
+            return build_path(goal, predecessors)
+        if distance > distances[u]:
+            # outdated heap entry
+            continue
+        for neighbor in graph[u]:
+            alt = distance + weight(u, neighbor)
+            if alt < distances.get(neighbor, infinity):
+                distances[neighbor] = alt
+                predecessors[neighbor] = u
+                heappush(heap, (alt, neighbor))
+    raise NoPathError(f"goal {goal} is not reachable from {start}")
+
+
+def build_path(goal, predecessors):
+    """ Returns the path from the root of predecessors to goal as a list """
+    path = []
+    pred = goal
+    while pred is not None:
+        path.append(pred)
+        pred = predecessors[pred]
+    path.reverse()
+    return path
+
+
+def bfs_distances(graph, source):
+    """ Returns a dict with the distance (number of edges) of every reachable vertex to source """
+    distances = {source: 0}
+    queue = deque([source])
+    while queue:
+        u = queue.popleft()
+        next_distance = distances[u] + 1
+        for neighbor in graph[u]:
+            if neighbor not in distances:
+                distances[neighbor] = next_distance
+                queue.append(neighbor)
+    return distances
+
+
+def nearest_vertex(graph, start, is_target):
+    """
+    Searches the vertex closest to start, for which is_target(vertex) is True.
+    Returns a tuple (vertex, distance) or (None, infinity) if there is no such vertex
+    """
+    if start not in graph:
+        return None, infinity
+    if is_target(start):
+        return start, 0
+    distances = {start: 0}
+    queue = deque([start])
+    while queue:
+        u = queue.popleft()
+        next_distance = distances[u] + 1
+        for neighbor in graph[u]:
+            if neighbor not in distances:
+                if is_target(neighbor):
+                    return neighbor, next_distance
+                distances[neighbor] = next_distance
+                queue.append(neighbor)
+    return None, infinity
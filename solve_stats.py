@@ -0,0 +1,100 @@
+# Copyright 2019 (C) Lukas Berger [lukas.berger@uranus.uni-freiburg.de]
+
+from time import perf_counter
+
+PHASES = ("update_agents", "check_for_escaping", "move")
+COUNTERS = ("rounds", "path_queries", "searches", "escape_searches", "immediate_escapes", "deleted_vertices",
+            "field_builds", "nodes_expanded", "nodes_repaired", "memo_hits", "memo_misses", "path_cache_hits",
+            "path_cache_misses")
+
+
+class SolveStats:
+    """
+    Counters and phase timers of one Solver.solve run, filled in when it is passed as stats.
+    Without stats the solver does not measure anything.
+    - times: seconds spent in every phase of the agents (update_agents, check_for_escaping and move)
+    - path_queries: paths to goals, searches: searches of escape paths with the path finder,
+      escape_searches: searches of the nearest escape, immediate_escapes: immediate escapes that were needed,
+      deleted_vertices: vertices deleted from the graph
+    - field_builds: distance fields built, nodes_expanded: vertices reached while building them,
+      nodes_repaired: vertices whose distance changed while repairing them
+    - memo_hits, memo_misses: lookups in the RoundMemo of the agents,
+      path_cache_hits, path_cache_misses: path queries answered by the PathCache of the agents or not
+    Every hook(phase, agent, seconds) is called after each phase of each agent, e.g. for an external profiler.
+    """
+
+    def __init__(self, hooks=()):
+        self.hooks = list(hooks)
+        self.times = {phase: 0.0 for phase in PHASES}
+        for name in COUNTERS:
+            setattr(self, name, 0)
+        self.fields = None
+        self.field_counts = None
+        self.memo = None
+        self.memo_counts = None
+        self.path_cache = None
+        self.path_cache_counts = None
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def start(self, agents):
+        """
+        Lets the agents count into the stats and remembers the counters of their distance fields,
+        memo and path cache
+        """
+        for agent in agents:
+            agent.stats = self
+        self.fields = agents[0].fields if len(agents) > 0 else None
+        if self.fields is not None:
+            self.field_counts = (self.fields.builds, self.fields.expanded, self.fields.repaired)
+        self.memo = agents[0].memo if len(agents) > 0 else None
+        if self.memo is not None:
+            self.memo_counts = (self.memo.hits, self.memo.misses)
+        self.path_cache = agents[0].path_cache if len(agents) > 0 else None
+        if self.path_cache is not None:
+            self.path_cache_counts = (self.path_cache.hits, self.path_cache.misses)
+
+    def finish(self, agents):
+        """
+        Adds the work of the distance fields, the memo and the path cache since start
+        and detaches the stats from the agents
+        """
+        for agent in agents:
+            agent.stats = None
+        if self.fields is not None:
+            builds, expanded, repaired = self.field_counts
+            self.field_builds += self.fields.builds - builds
+            self.nodes_expanded += self.fields.expanded - expanded
+            self.nodes_repaired += self.fields.repaired - repaired
+            self.fields = None
+        if self.memo is not None:
+            hits, misses = self.memo_counts
+            self.memo_hits += self.memo.hits - hits
+            self.memo_misses += self.memo.misses - misses
+            self.memo = None
+        if self.path_cache is not None:
+            hits, misses = self.path_cache_counts
+            self.path_cache_hits += self.path_cache.hits - hits
+            self.path_cache_misses += self.path_cache.misses - misses
+            self.path_cache = None
+
+    def phase(self, name, agent, function, *args):
+        """ Runs function(*args) as phase name of agent and measures it """
+        start = perf_counter()
+        function(*args)
+        seconds = perf_counter() - start
+        self.times[name] += seconds
+        for hook in self.hooks:
+            hook(name, agent, seconds)
+
+    def as_dict(self):
+        """ Returns all counters and phase times as one flat dict """
+        stats = {name: getattr(self, name) for name in COUNTERS}
+        for phase, seconds in self.times.items():
+            stats[f"{phase}_time"] = seconds
+        return stats
+
+    def __str__(self):
+        return "\n".join(f"{name}:\t{value:.4f}" if isinstance(value, float) else f"{name}:\t{value}"
+                         for name, value in self.as_dict().items())
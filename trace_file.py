@@ -0,0 +1,137 @@
+# Copyright 2019 (C) Lukas Berger [lukas.berger@uranus.uni-freiburg.de]
+
+import mmap
+import struct
+import sys
+from Solver import Change, RoundTrace
+
+MAGIC = b"MAPFTRC1"
+BYTE_ORDER = b"<" if sys.byteorder == "little" else b">"
+# round, agent id, from, to, escaping and escape target (-1 for None) of one change
+RECORD = struct.Struct("=iiiibi")
+NO_ESCAPE = -1
+
+
+class TraceWriter:
+    """
+    Appends the RoundTraces of Solver.solve_rounds to a binary file of fixed width records,
+    one per change. The rounds are written in ascending order, so a TraceReader can find
+    any round by binary search.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "wb")
+        self.file.write(MAGIC + BYTE_ORDER)
+
+    def write(self, round_trace):
+        """ Appends the changes of one round """
+        pack = RECORD.pack
+        number = round_trace.round
+        self.file.write(b"".join(pack(number, change.agent, change.source, change.target, change.escaping,
+                                      NO_ESCAPE if change.escape is None else change.escape)
+                                 for change in round_trace.changes))
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+
+def write_trace(path, rounds):
+    """ Writes every round of a solve_rounds generator into path and returns the result of solve """
+    with TraceWriter(path) as writer:
+        while True:
+            try:
+                round_trace = next(rounds)
+            except StopIteration as stop:
+                return stop.value
+            writer.write(round_trace)
+
+
+class TraceReader:
+    """
+    Reads a trace file of a TraceWriter. The file is memory mapped and only the records
+    of the requested rounds are unpacked.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[0:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is no trace file")
+        if self.data[len(MAGIC):len(MAGIC) + 1] != BYTE_ORDER:
+            raise ValueError(f"{path} was written on a machine with a different byte order")
+        self.start = len(MAGIC) + 1
+        # a record cut off at the end of the file is ignored
+        self.size = (len(self.data) - self.start) // RECORD.size
+
+    def __len__(self):
+        return self.size
+
+    def round_of(self, index):
+        """ Returns the round of the record at index """
+        return struct.unpack_from("=i", self.data, self.start + index * RECORD.size)[0]
+
+    def find(self, number):
+        """ Returns the index of the first record of the round number or a later round """
+        low = 0
+        high = self.size
+        while low < high:
+            middle = (low + high) // 2
+            if self.round_of(middle) < number:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def record(self, index):
+        """ Returns the record at index as (round, Change) """
+        number, agent, source, target, escaping, escape = RECORD.unpack_from(self.data,
+                                                                             self.start + index * RECORD.size)
+        return number, Change(agent, source, target, escaping == 1, None if escape == NO_ESCAPE else escape)
+
+    def round(self, number):
+        """ Returns the RoundTrace of the round number, it has no changes if nothing happened in it """
+        changes = []
+        for index in range(self.find(number), self.size):
+            record_round, change = self.record(index)
+            if record_round != number:
+                break
+            changes.append(change)
+        return RoundTrace(number, changes)
+
+    def rounds(self, first=0, last=None):
+        """ Yields the RoundTraces of all rounds from first to last (inclusive), which have changes """
+        current = None
+        for index in range(self.find(first), self.size):
+            number, change = self.record(index)
+            if last is not None and number > last:
+                break
+            if current is None or current.round != number:
+                if current is not None:
+                    yield current
+                current = RoundTrace(number, [])
+            current.changes.append(change)
+        if current is not None:
+            yield current
+
+    def positions(self, number):
+        """ Returns a dict of agent id and position after the round number, replayed from round 0 """
+        positions = {}
+        for round_trace in self.rounds(0, number):
+            for change in round_trace.changes:
+                positions[change.agent] = change.target
+        return positions
+
+    def close(self):
+        self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
@@ -0,0 +1,123 @@
+# Copyright 2019 (C) Lukas Berger [lukas.berger@uranus.uni-freiburg.de]
+
+from path_index import PathIndex
+
+
+class AgentView:
+    """ Everything the other agents can observe about one agent: its position and its paths to all of its goals """
+
+    def __init__(self, agent, step):
+        self.id = agent.get_id()
+        self.pos = agent.get_pos()
+        # the step of the world model, at which the view was made
+        self.step = step
+        self.size = len(agent.graph)
+        self.paths = {}
+        for goal in agent.get_goals():
+            self.paths[goal] = agent.path_to_goal(self.pos, goal)
+
+
+class WorldModel:
+    """
+    Shared, read only model of all agents, which replaces the ReducedAgent paths every agent
+    used to compute for every other agent on its own. The paths of an agent are computed once per
+    position, so a round costs one path per agent and goal instead of one per observer, agent and goal.
+    The agents only keep their private beliefs about each other (waited_since, waiting and the ignored goals).
+
+    Solver.solve publishes every move (agent_moved) and the agents publish every deleted vertex
+    (vertex_deleted). Every change increases the step, so observers can tell which agents changed
+    since they looked at them the last time and only update those.
+
+    The paths of the views of all agents, which are not on their goal, are kept in a PathIndex
+    (path_index). Like the views, they are only updated when a view is asked for.
+    """
+
+    def __init__(self):
+        self.views = {}
+        self.agents = {}
+        self.path_index = None
+        self.step = 0
+        self.moved_at = {}
+        self.deletions = []
+
+    def update(self, agents):
+        """
+        Builds the views of all agents, which are not on their goal, at the beginning of a round.
+        Solver.solve calls this every round. With less than two of them nobody looks at the views,
+        so they are not built, a decoy goal the last agent cannot reach anymore does not matter then
+        """
+        active = sum(1 for agent in agents if not agent.on_goal())
+        for agent in agents:
+            if not agent.on_goal():
+                if active > 1:
+                    self.view(agent)
+            elif self.path_index is not None:
+                self.path_index.remove_owner(agent.get_id())
+
+    def view(self, agent):
+        """
+        Returns the view of agent. It is rebuilt if the agent moved or a vertex on its paths got deleted,
+        because agents move one after another within a round
+        """
+        view = self.views.get(agent.get_id())
+        if view is None or not self.is_current(view, agent):
+            view = AgentView(agent, self.step)
+            self.views[agent.get_id()] = view
+            self.agents[agent.get_id()] = agent
+            if self.path_index is None:
+                self.path_index = PathIndex(agent.graph)
+            if agent.on_goal():
+                self.path_index.remove_owner(agent.get_id())
+            else:
+                for goal, path in view.paths.items():
+                    self.path_index.add((agent.get_id(), goal), path)
+        return view
+
+    def has_current_view(self, agent_id):
+        """ Tests if the view of the agent with agent_id and so its paths in the path index are up to date """
+        view = self.views.get(agent_id)
+        return view is not None and self.is_current(view, self.agents[agent_id])
+
+    def is_current(self, view, agent):
+        """ Tests if the paths of the view are still the ones the agent would compute now """
+        if view.pos != agent.get_pos():
+            return False
+        deleted = self.deleted_since(view.step)
+        if len(agent.graph) != view.size - len(deleted):
+            # the graph changed without being published
+            return False
+        return self.unchanged(agent.get_id(), view.step, view.paths)
+
+    def agent_moved(self, agent):
+        """ Publishes that agent moved """
+        self.step += 1
+        self.moved_at[agent.get_id()] = self.step
+        if agent.on_goal() and self.path_index is not None:
+            self.path_index.remove_owner(agent.get_id())
+
+    def vertex_deleted(self, vertex):
+        """ Publishes that vertex got deleted from the graph """
+        self.step += 1
+        self.deletions.append((self.step, vertex))
+
+    def deleted_since(self, step):
+        """ Returns the vertices, which got deleted after step """
+        deleted = []
+        for deleted_at, vertex in reversed(self.deletions):
+            if deleted_at <= step:
+                break
+            deleted.append(vertex)
+        return deleted
+
+    def unchanged(self, agent_id, step, paths):
+        """
+        Tests if the agent did not move since step and no vertex on its paths got deleted.
+        A shortest path stays the same, as long as none of its vertices is deleted
+        """
+        if step is None or self.moved_at.get(agent_id, 0) > step:
+            return False
+        for vertex in self.deleted_since(step):
+            for path in paths.values():
+                if vertex in path:
+                    return False
+        return True